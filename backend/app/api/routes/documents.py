@@ -1,93 +1,118 @@
 # app/api/routes/documents.py
-from datetime import datetime
-from typing import Dict
-import uuid
+from typing import List
+import json
+import time
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Form
-from app.services.document_processor import extract_text_from_document
-from app.services.occupation_suggestion_llm_service import analyze_cv_with_llm
-from app.services.occupation_matcher import match_occupations
-from app.models.response import CVAnalysisResponse
-from app.services.auth_service import get_current_user
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from app.core.config import settings
+from app.models.response import CVAnalysisResponse, CVJobResponse
+from app.services.auth_service import get_current_user, get_current_user_id
 from app.db.supabase_client import get_supabase_client
 from app.services.applicant_data_service import extract_and_save_applicant_data
+from app.services.upload_service import spool_batch, spool_upload
+from app.services.cv_pipeline import check_client_owner, process_cv, process_cv_batch
+from app.services.cv_jobs import cv_jobs, job_events
+from app.services.llm_gateway import llm_user
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 @router.post("/upload-cv", response_model=CVAnalysisResponse)
 async def upload_cv(
     file: UploadFile = File(),
     current_user: dict = Depends(get_current_user),
-    client_id: str = Form(None)
+    client_id: str = Form(None),
+    top_k: int = Form(3, ge=1, le=20),
+    async_mode: bool = Form(False)
 ):
-    """Uploads and processes a CV file, extracting text and analyzing with LLM."""
-    
-    # Validate file type
-    allowed_types = [
-        "application/pdf", 
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-    ]
+    """
+    Uploads and processes a CV file, extracting text and analyzing with LLM.
+    With async_mode the file is validated, queued and answered with 202 and a
+    job id; progress is available from /documents/jobs/{job_id}.
+    """
+    if client_id:
+        check_client_owner(client_id, current_user["id"])
+
+    # Copy the upload (its request was capped by UploadLimitMiddleware) and identify it from its magic bytes
+    upload = await spool_upload(file)
+
+    if async_mode:
+        try:
+            job = cv_jobs.submit(upload, current_user["id"], client_id, file.filename, top_k)
+        except Exception:
+            upload.close()
+            raise
+        status_url = f"{settings.API_V1_STR}{router.prefix}/jobs/{job['job_id']}"
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "status_url": status_url,
+                "events_url": f"{status_url}/events",
+            },
+        )
+
+    try:
+        return await process_cv(upload, current_user["id"], client_id, file.filename, top_k)
+    finally:
+        upload.close()
     
-    if file.content_type not in allowed_types:
-        raise HTTPException(status_code=400, detail="File must be PDF or DOCX")
     
-    # Read file content
-    file_content = await file.read()
+@router.post("/upload-cv/batch")
+async def upload_cv_batch(
+    files: List[UploadFile] = File(...),
+    current_user: dict = Depends(get_current_user),
+    top_k: int = Form(3, ge=1, le=20)
+):
+    """
+    Uploads several CVs, or zip archives of CVs, and processes them together.
+    The response is newline-delimited JSON: one line per file as it finishes,
+    then a summary line.
+    """
+    entries = await spool_batch(files)
 
-    # Extract text from document
-    try:
-        extracted_text = await extract_text_from_document(file_content, file.content_type)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error extracting text: {str(e)}")
+    async def result_lines():
+        started = time.perf_counter()
+        completed = failed = 0
+        async for line in process_cv_batch(entries, current_user["id"], top_k):
+            if line["status"] == "completed":
+                completed += 1
+            else:
+                failed += 1
+            yield json.dumps(line, default=str) + "\n"
+        summary = {"files": len(entries), "completed": completed, "failed": failed, "seconds": round(time.perf_counter() - started, 3)}
+        yield json.dumps({"summary": summary}) + "\n"
 
-    # Process with LLM
-    try:
-        analysis_result = await analyze_cv_with_llm(extracted_text)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analyzing with LLM: {str(e)}")
+    def close_uploads():
+        for _, upload, _ in entries:
+            if upload is not None:
+                upload.close()
 
-    # Match with occupations
-    try:
-        occupation_matches = await match_occupations(analysis_result)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error matching occupations: {str(e)}")
+    # Uploads are normally closed as they are processed; this covers a client disconnecting early
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson", background=BackgroundTask(close_uploads))
 
-    # Store document in database
-    document_id = str(uuid.uuid4())
-    document_data = {
-        "id": document_id,
-        "user_id": current_user["id"],
-        "client_id": client_id,  # Link to client if provided
-        "filename": file.filename,
-        "file_type": file.content_type,
-        "file_size": len(file_content),
-        "extracted_text": extracted_text,
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat(),
-    }
 
-    # Save document to database
-    supabase_client = get_supabase_client()
-    supabase_client.table("documents").insert(document_data).execute()
+@router.get("/jobs/{job_id}", response_model=CVJobResponse)
+async def get_cv_job(job_id: str, user_id: str = Depends(get_current_user_id)):
+    """Status, stage history and, once finished, the result of an async CV upload."""
+    job = cv_jobs.get(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_cv_job_events(job_id: str, user_id: str = Depends(get_current_user_id)):
+    """Server-sent events for an async CV upload: stage transitions, then the result or error."""
+    if cv_jobs.get(job_id, user_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        job_events(job_id, user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    # Store occupation matches in a separate table
-    for match in occupation_matches:
-        match_data = {
-            "id": str(uuid.uuid4()),
-            "document_id": document_id,
-            "anzsco_code": match.get("anzsco_code"),
-            "occupation_name": match.get("occupation_name"),
-            "confidence_score": match.get("confidence_score"),
-            "created_at": datetime.now().isoformat(),
-        }
-        supabase_client.table("document_occupations").insert(match_data).execute()
 
-    # Return the results along with the document ID for reference
-    return {
-        "document_id": document_id,
-        "extracted_info": analysis_result,
-        "occupation_matches": occupation_matches,
-    }
-    
-    
 @router.get("/client/{client_id}/latest")
 async def get_latest_document(
     client_id: str,
@@ -144,6 +169,7 @@ async def extract_applicant_data(
     try:
         client_id = document["client_id"]
         extracted_text = document["extracted_text"]
+        llm_user.set(current_user["id"])
         
         # Extract and save applicant data
         result = await extract_and_save_applicant_data(extracted_text, client_id)
@@ -0,0 +1,37 @@
+# app/api/routes/metrics.py
+from typing import Any, Dict
+from fastapi import APIRouter, Depends
+from app.services.auth_service import get_current_user
+from app.services.embedding_cache import embedding_cache
+from app.services.cv_jobs import cv_jobs
+from app.services.document_cache import document_cache
+from app.services.document_processor import extraction_metrics
+from app.services.llm_cache import llm_cache
+from app.services.llm_gateway import llm_gateway
+from app.services.model_router import routing_metrics
+from app.services.occupation_index import occupation_index
+from app.services.text_normalizer import normalization_metrics
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("", response_model=Dict[str, Any])
+async def get_metrics(current_user: dict = Depends(get_current_user)) -> Dict[str, Any]:
+    """Runtime counters for caches and indexes in this worker."""
+    return {
+        "occupation_index": {
+            "version": occupation_index.version,
+            "source": occupation_index.source,
+            "occupations": len(occupation_index),
+            "backend": occupation_index.backend,
+            "quantization": occupation_index.quantization,
+            "loaded_at": occupation_index.loaded_at,
+        },
+        "embedding_cache": embedding_cache.stats(),
+        "document_extraction": extraction_metrics.stats(),
+        "document_cache": document_cache.stats(),
+        "cv_jobs": cv_jobs.stats(),
+        "text_normalization": normalization_metrics.stats(),
+        "llm": llm_gateway.stats(),
+        "llm_cache": llm_cache.stats(),
+        "llm_routing": routing_metrics.stats(),
+    }
@@ -0,0 +1,24 @@
+# app/api/routes/occupations.py
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from app.models.occupation import OccupationSearchResponse
+from app.services.auth_service import get_current_user_id
+from app.services.occupation_index import get_occupation_index
+
+router = APIRouter(prefix="/occupations", tags=["occupations"])
+
+@router.get("/search", response_model=OccupationSearchResponse)
+async def search_occupations(
+    q: str = Query(..., min_length=1, max_length=100),
+    occupation_list: Optional[str] = Query(None, alias="list", description="Occupation list, e.g. MLTSSL"),
+    visa_subclass: Optional[str] = Query(None, description="Visa subclass, e.g. 189"),
+    limit: int = Query(10, ge=1, le=50),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Typeahead search over ANZSCO occupation names and codes.
+    Served from the in-memory occupation index; never queries the database.
+    """
+    index = get_occupation_index()
+    results = index.prefix_index.search(q, limit=limit, occupation_list=occupation_list, visa_subclass=visa_subclass)
+    return {"query": q, "index_version": index.version, "results": results}
@@ -5,9 +5,10 @@ from app.services.visa_assessment_service import (
     get_visa_assessment,
     get_user_visa_assessments,
     update_visa_assessment,
-    extract_applicant_data_from_cv
+    get_document_applicant_data
 )
 from app.db.supabase_client import get_supabase_client
+from app.services.llm_gateway import llm_user
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 
@@ -55,6 +56,7 @@ class VisaAssessmentRequest(BaseModel):
     visa_subclass: str
     document_id: Optional[str] = None
     occupation_code: Optional[str] = None
+    refresh_applicant_data: bool = False  # Re-run extraction instead of using the stored copy
     
     
 router = APIRouter(prefix="/visa-assessment", tags=["visa-assessment"])
@@ -231,6 +233,7 @@ async def create_assessment(
     """Create a new visa assessment for a client"""
     print("--Create assessment endpoint called with:", request.dict())
 
+    llm_user.set(current_user["id"])
     client_id = request.client_id
     visa_subclass = request.visa_subclass
     occupation_code = request.occupation_code
@@ -245,10 +248,13 @@ async def create_assessment(
         document = get_latest_document(client_id, current_user)  # This will raise NO_CV_FOUND if no document exists
         document_id = document['id']
         
-        # Extract applicant data if document has extracted text
+        # Applicant data extracted from the document, stored after the first assessment
         applicant_data = None
         if document.get("extracted_text"):
-            applicant_data = await extract_applicant_data_from_cv(document["extracted_text"])
+            applicant_data = await get_document_applicant_data(document, refresh=request.refresh_applicant_data)
+            if "error" in applicant_data:
+                print(f"Applicant data extraction failed: {applicant_data['error']}")
+                applicant_data = None
 
         # Get occupation details if not provided in the request (but it's not mandatory)
         occupation_name = None
@@ -0,0 +1,85 @@
+# app/api/upload_limit.py
+import json
+from typing import Dict
+
+from app.services.upload_service import too_large_message
+
+# Room for multipart boundaries, headers and the small form fields next to the file
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class RequestBodyTooLarge(Exception):
+    """The request body went past the route's limit while it was being received."""
+
+
+class UploadLimitMiddleware:
+    """
+    Caps the request body of upload routes before the form is parsed.
+
+    Starlette reads the whole multipart body into its own spooled files before
+    a route runs, so limits checked in the route only bound a second copy.
+    A declared Content-Length over the limit is answered with 413 without
+    reading the body; a body that grows past it while streaming (chunked or
+    understated) is cut off and answered with 413 as well.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits  # path -> largest accepted file size in bytes
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        max_body = limit + FORM_OVERHEAD_BYTES
+        content_length = dict(scope["headers"]).get(b"content-length")
+        try:
+            declared = int(content_length) if content_length is not None else None
+        except ValueError:
+            declared = None
+        if declared is not None and declared > max_body:
+            await send_too_large(send, limit)
+            return
+
+        received = 0
+        too_large = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    too_large = True
+                    raise RequestBodyTooLarge()
+            return message
+
+        async def checked_send(message):
+            nonlocal response_started
+            if too_large:
+                # The app answers a failed body read with its own error; the client gets 413
+                if not response_started:
+                    response_started = True
+                    await send_too_large(send, limit)
+                return
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, checked_send)
+        except RequestBodyTooLarge:
+            if not response_started:
+                await send_too_large(send, limit)
+
+
+async def send_too_large(send, limit: int) -> None:
+    body = json.dumps({"detail": too_large_message(limit)}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), (b"connection", b"close")],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -1,6 +1,10 @@
 # app/core/config.py
+from pathlib import Path
 from pydantic_settings import BaseSettings
 
+# Relative data paths in settings are resolved against the backend directory
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Visa Assessment System"
     API_V1_STR: str = "/api/v1"
@@ -11,6 +15,30 @@ class Settings(BaseSettings):
     
     # OpenAI API settings
     OPENAI_API_KEY: str
+    OPENAI_TIMEOUT_SECONDS: float = 30.0
+    OPENAI_MAX_CONNECTIONS: int = 20
+
+    # LLM gateway: concurrency limits, retries on 429/5xx, and the deadline for a call including retries
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_MAX_CONCURRENCY_PER_USER: int = 4
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_SECONDS: float = 0.5
+    LLM_RETRY_MAX_SECONDS: float = 8.0
+    LLM_DEADLINE_SECONDS: float = 60.0
+
+    # Structured extractions go to the fast model first and escalate to the fallback model
+    # when the output fails schema validation or fills less than this share of the key fields
+    LLM_ROUTING_ENABLED: bool = True
+    LLM_FAST_MODEL: str = "gpt-4o-mini"
+    LLM_FALLBACK_MODEL: str = "gpt-4o"
+    LLM_ROUTING_MIN_COVERAGE: float = 0.5
+
+    # Responses to deterministic chat calls (temperature 0, JSON mode), keyed by the full request
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = "data/cache/llm_responses.sqlite3"
+    LLM_CACHE_MEMORY_SIZE: int = 256
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 10000
     
     # New authentication settings
     SECRET_KEY: str
@@ -20,8 +48,84 @@ class Settings(BaseSettings):
     # Google OAuth
     GOOGLE_CLIENT_ID: str
 
+    # Occupation index snapshot (written by scripts/import_occupations.py, memory-mapped by workers)
+    OCCUPATION_SNAPSHOT_DIR: str = "data/occupation_index"
+
+    # Compact first-pass scan ("none", "float16" or "int8"), rescored exactly over this many candidates
+    OCCUPATION_INDEX_QUANTIZATION: str = "none"
+    OCCUPATION_INDEX_RESCORE_CANDIDATES: int = 50
+
+    # Search backend: "exact" scan or "ivf" approximate index (lists built offline, 0 = about 4*sqrt(rows))
+    OCCUPATION_INDEX_BACKEND: str = "exact"
+    OCCUPATION_IVF_LISTS: int = 0
+    OCCUPATION_IVF_PROBES: int = 8
+    # Log recall@5 of quantized/IVF search against an exact scan on every index load (slow on large indexes)
+    OCCUPATION_INDEX_RECALL_CHECK: bool = False
+
+    # Minimum trigram similarity for a suggestion to resolve to an ANZSCO title without embeddings
+    LEXICAL_MATCH_THRESHOLD: float = 0.9
+
+    # Embeddings for suggested occupation titles
+    EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_CACHE_PATH: str = "data/cache/embeddings.sqlite3"
+    EMBEDDING_CACHE_MEMORY_SIZE: int = 2048
+    EMBEDDING_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 100000
+    EMBEDDING_MAX_CONCURRENCY: int = 8
+
+    # CV text extraction process pool
+    EXTRACTION_WORKERS: int = 2
+    EXTRACTION_MAX_TASKS_PER_WORKER: int = 50  # Recycle worker processes after this many documents
+    EXTRACTION_TIMEOUT_SECONDS: float = 30.0
+    EXTRACTION_MAX_PAGES: int = 50
+    EXTRACTION_PAGES_PER_JOB: int = 10  # Longer PDFs are split into page ranges parsed in parallel
+
+    # CV uploads
+    UPLOAD_MAX_BYTES: int = 10 * 1024 * 1024
+    UPLOAD_SPOOL_BYTES: int = 1024 * 1024  # Larger uploads are spooled to a temp file
+
+    # Concurrent branches of CV upload processing
+    CV_SUGGESTION_TIMEOUT_SECONDS: float = 60.0
+    CV_APPLICANT_DATA_TIMEOUT_SECONDS: float = 90.0
+
+    # Background CV processing (upload-cv with async_mode)
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_MAX_SIZE: int = 100
+    JOB_HISTORY_SIZE: int = 1000  # Job records kept in memory; older ones are read from the store
+    JOB_STORE_PATH: str = "data/cache/jobs.sqlite3"
+    JOB_RETENTION_SECONDS: int = 24 * 3600  # Job records (with their results) expire this long after their last change
+    JOB_STORE_MAX_ENTRIES: int = 10000
+    JOB_EVENT_POLL_SECONDS: float = 0.5
+
+    # "separate": suggestions, client record and assessment data each use their own prompt.
+    # "combined": one structured call per CV (cv_profile_service) feeds all three.
+    LLM_EXTRACTION_MODE: str = "separate"
+
+    # CV text sent to the LLM services is normalized and cut to this many tokens
+    LLM_CV_TOKEN_BUDGET: int = 6000
+    LLM_TOKENIZER_ENCODING: str = "o200k_base"  # Tokenizer of the gpt-4o model family
+    LLM_TOKENIZER_CACHE_DIR: str = "data/tiktoken"  # Encoding files; fill with scripts/fetch_tokenizer.py to run offline
+
+    # Analysis results of previously seen CVs, keyed by file hash. They hold the
+    # CV's extracted text, so they expire rather than outlive deleted documents
+    DOCUMENT_CACHE_PATH: str = "data/cache/documents.sqlite3"
+    DOCUMENT_CACHE_MEMORY_SIZE: int = 256
+    DOCUMENT_CACHE_TTL_SECONDS: int = 24 * 3600
+    DOCUMENT_CACHE_MAX_ENTRIES: int = 5000
+
+    # Batch CV uploads (upload-cv/batch)
+    BATCH_MAX_FILES: int = 50
+    BATCH_CONCURRENCY: int = 4
+    BATCH_MAX_ARCHIVE_BYTES: int = 100 * 1024 * 1024  # Also caps the whole body of a batch request
+    BATCH_MATCH_WINDOW_SECONDS: float = 0.5  # Files finishing analysis this close together share one matching call
+
     class Config:
         case_sensitive = True
         env_file = ".env"  # Optional: to specify a custom environment file
 
 settings = Settings()
+
+def resolve_data_path(path: str) -> Path:
+    """Resolve a data path from settings, treating relative paths as relative to the backend directory."""
+    resolved = Path(path)
+    return resolved if resolved.is_absolute() else BACKEND_ROOT / resolved
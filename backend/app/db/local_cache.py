@@ -0,0 +1,189 @@
+# app/db/local_cache.py
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+
+class LRUCache:
+    """Small thread-safe in-process LRU map."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class SQLiteStore:
+    """
+    Persistent key/value store in a local SQLite file.
+
+    Values are raw bytes; callers choose their own encoding. One file can hold
+    several namespaces, each in its own table.
+    """
+
+    def __init__(self, path: Path, namespace: str):
+        self.path = Path(path)
+        self.table = namespace
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(self.path), check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")  # Several workers may share the file
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            connection = self._connect()
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = connection.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def set_many(self, items: Dict[str, bytes]) -> None:
+        if not items:
+            return
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)", list(items.items())
+                )
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(key,) for key in keys])
+
+
+
+class ExpiringSQLiteStore(SQLiteStore):
+    """
+    SQLiteStore whose entries expire ttl_seconds after being written. Every
+    100 writes, expired rows are deleted and the table is trimmed to
+    max_entries rows, least recently read first.
+    """
+
+    def __init__(self, path: Path, namespace: str, ttl_seconds: float, max_entries: int):
+        super().__init__(path, namespace)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(self.path), check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            columns = {row[1] for row in connection.execute(f"PRAGMA table_info({self.table})")}
+            if columns and "written_at" not in columns:
+                # Left by a plain SQLiteStore: its rows have no write time to expire by, so start over
+                connection.execute(f"DROP TABLE {self.table}")
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, written_at REAL NOT NULL, read_at REAL NOT NULL)"
+            )
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_read_at ON {self.table} (read_at)")
+            self._connection = connection
+        return self._connection
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = connection.execute(
+                        f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders}) AND written_at > ?",
+                        chunk + [now - self.ttl_seconds],
+                    ).fetchall()
+                    found.update(rows)
+                if found:
+                    connection.executemany(
+                        f"UPDATE {self.table} SET read_at = ? WHERE key = ?", [(now, key) for key in found]
+                    )
+        return found
+
+    def set_many(self, items: Dict[str, bytes]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, written_at, read_at) VALUES (?, ?, ?, ?)",
+                    [(key, value, now, now) for key, value in items.items()],
+                )
+                self._writes += len(items)
+                # Sweep now and then rather than on every write
+                if self._writes >= 100:
+                    self._writes = 0
+                    self._evict(connection, now)
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        expired = connection.execute(
+            f"DELETE FROM {self.table} WHERE written_at <= ?", (now - self.ttl_seconds,)
+        ).rowcount
+        overflow = connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            connection.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY read_at LIMIT ?)",
+                (overflow,),
+            )
+        self.evictions += expired + max(overflow, 0)
@@ -1,11 +1,27 @@
 # app/main.py
+import threading
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import documents, auth, users, visa_assessment  # Import the new auth router
+from app.api.routes import documents, auth, users, visa_assessment, metrics, occupations  # Import the new auth router
+from app.api.upload_limit import UploadLimitMiddleware
 from app.core.config import settings
+from app.services.occupation_index import occupation_index
+from app.services.document_processor import shutdown_extraction_pool
+from app.services.cv_jobs import cv_jobs
+from app.services.text_normalizer import load_encoding
 
 app = FastAPI(title="Visa Assessment API")
 
+# Refuse oversized uploads before the multipart body is read (added first so CORS headers still wrap the 413)
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        f"{settings.API_V1_STR}/documents/upload-cv": settings.UPLOAD_MAX_BYTES,
+        f"{settings.API_V1_STR}/documents/upload-cv/batch": settings.BATCH_MAX_ARCHIVE_BYTES,
+    },
+)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +41,34 @@ app.include_router(users.router, prefix=settings.API_V1_STR)  # Make sure this i
 
 #-----------
 app.include_router(visa_assessment.router, prefix=settings.API_V1_STR, tags=["visa-assessment"])  # Add this line
+app.include_router(occupations.router, prefix=settings.API_V1_STR, tags=["occupations"])
+app.include_router(metrics.router, prefix=settings.API_V1_STR, tags=["metrics"])
+
+
+@app.on_event("startup")
+async def load_occupation_index():
+    # Load occupation embeddings once per worker; matching falls back to lazy loading on failure
+    try:
+        occupation_index.reload()
+    except Exception as e:
+        print(f"Error loading occupation index at startup: {e}")
+
+
+@app.on_event("startup")
+async def load_tokenizer():
+    # May download the encoding file; token counts are estimated until it is loaded
+    threading.Thread(target=load_encoding, name="load-tokenizer", daemon=True).start()
+
+
+@app.on_event("startup")
+async def start_cv_job_workers():
+    cv_jobs.start()
+
+
+@app.on_event("shutdown")
+async def stop_extraction_pool():
+    await cv_jobs.stop()
+    shutdown_extraction_pool()
 
 
 @app.get("/")
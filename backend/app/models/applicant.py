@@ -0,0 +1,140 @@
+# app/models/applicant.py
+import re
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, model_validator
+from typing import Annotated, Any, List, Optional
+
+# Schemas the LLM extraction outputs are validated against before use. A
+# response that fails validation, or fills too few of the fields that matter
+# (coverage), is escalated to the fallback model by the model router.
+
+
+LEADING_NUMBER = re.compile(r"^\s*(\d+(?:\.\d+)?)")
+
+
+def lenient_number(value: Any) -> Optional[float]:
+    """A number, or the number a string starts with ("32 years"); anything else ("N/A") is None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        match = LEADING_NUMBER.match(value)
+        return float(match.group(1)) if match else None
+    return None
+
+
+# Optional numbers in model output: one unparseable value must not fail the whole extraction
+LenientFloat = Annotated[Optional[float], BeforeValidator(lenient_number)]
+
+
+class ExtractionModel(BaseModel):
+    model_config = ConfigDict(extra="ignore", coerce_numbers_to_str=True)
+
+    @model_validator(mode="before")
+    @classmethod
+    def drop_nulls(cls, data):
+        # null and missing mean the same thing in model output; both take the default
+        if isinstance(data, dict):
+            return {key: value for key, value in data.items() if value is not None}
+        return data
+
+
+class Education(ExtractionModel):
+    level: str = ""
+    field: str = ""
+    institution: str = ""
+    country: str = ""
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+
+class Experience(ExtractionModel):
+    title: str = ""
+    company: str = ""
+    country: str = ""
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    duration_years: LenientFloat = None
+
+
+class EnglishScores(ExtractionModel):
+    overall: LenientFloat = None
+    reading: LenientFloat = None
+    writing: LenientFloat = None
+    speaking: LenientFloat = None
+    listening: LenientFloat = None
+
+
+class English(ExtractionModel):
+    level: Optional[str] = None
+    test: Optional[str] = None
+    scores: EnglishScores = EnglishScores()
+
+
+class ClientPersonalDetails(ExtractionModel):
+    full_name: str = ""
+    email: str = ""
+    phone: str = ""
+    date_of_birth: Optional[str] = None
+    nationality: str = ""
+
+
+class PersonalDetails(ClientPersonalDetails):
+    age: LenientFloat = None
+
+
+class ClientDataExtraction(ExtractionModel):
+    """Client record fields, as requested by applicant_data_service."""
+    personal: ClientPersonalDetails = ClientPersonalDetails()
+    education: List[Education] = []
+    experience: List[Experience] = []
+
+    def coverage(self) -> float:
+        return field_coverage(
+            self.personal.full_name,
+            self.personal.email or self.personal.phone,
+            self.education,
+            self.experience,
+        )
+
+
+class ApplicantDataExtraction(ExtractionModel):
+    """Applicant data used for points calculation, as requested by visa_assessment_service."""
+    full_name: str = ""
+    email: str = ""
+    date_of_birth: Optional[str] = None
+    age: LenientFloat = None
+    education: List[Education] = []
+    experience: List[Experience] = []
+    english: English = English()
+
+    def coverage(self) -> float:
+        return field_coverage(
+            self.full_name,
+            self.date_of_birth or self.age,
+            self.education,
+            self.experience,
+        )
+
+
+class CVProfileExtraction(ExtractionModel):
+    """Combined profile and occupation suggestions, as requested by cv_profile_service."""
+    personal: PersonalDetails = PersonalDetails()
+    education: List[Education] = []
+    experience: List[Experience] = []
+    english: English = English()
+    occupations: List[str] = Field(min_length=1)
+
+    def coverage(self) -> float:
+        return field_coverage(
+            self.personal.full_name,
+            self.personal.date_of_birth or self.personal.age,
+            self.education,
+            self.experience,
+            self.occupations,
+        )
+
+
+def field_coverage(*values) -> float:
+    """Fraction of the given key fields that were filled in."""
+    return sum(1 for value in values if value) / len(values)
@@ -0,0 +1,15 @@
+# app/models/occupation.py
+from pydantic import BaseModel
+from typing import List, Optional
+
+class OccupationSearchResult(BaseModel):
+    anzsco_code: str
+    occupation_name: str
+    list: Optional[str] = None
+    visa_subclasses: Optional[str] = None
+    assessing_authority: Optional[str] = None
+
+class OccupationSearchResponse(BaseModel):
+    query: str
+    index_version: Optional[str] = None
+    results: List[OccupationSearchResult]
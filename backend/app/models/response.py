@@ -2,6 +2,14 @@
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 
+class OccupationCandidate(BaseModel):
+    anzsco_code: str
+    occupation_name: str
+    list: Optional[str] = None
+    visa_subclasses: Optional[str] = None
+    assessing_authority: Optional[str] = None
+    confidence_score: float
+
 class OccupationMatch(BaseModel):
     anzsco_code: str
     occupation_name: str
@@ -10,7 +18,37 @@ class OccupationMatch(BaseModel):
     assessing_authority: Optional[str] = None
     confidence_score: float
     suggested_occupation: str
+    candidates: List[OccupationCandidate] = []  # Top-k ranked candidates for this suggestion
+
+class PageExtraction(BaseModel):
+    page: int
+    method: str  # pypdf, pdfplumber, docx-xml or empty
+    seconds: float
+    chars: int
+
+class DocumentExtraction(BaseModel):
+    seconds: float
+    pages: List[PageExtraction]
 
 class CVAnalysisResponse(BaseModel):
     extracted_info: List[str]  # Changed from extracted_text to match your response
-    occupation_matches: List[OccupationMatch]
\ No newline at end of file
+    occupation_matches: List[OccupationMatch]
+    extraction: Optional[DocumentExtraction] = None
+    cached: bool = False  # Served from the document cache
+    applicant_data: Optional[Dict[str, Any]] = None  # Updated client record, for uploads linked to a client
+    warnings: List[str] = []  # Non-fatal branch failures
+
+class CVJobEvent(BaseModel):
+    stage: str  # queued, started, extracting, suggesting, matching, saving, completed or failed
+    at: str
+
+class CVJobResponse(BaseModel):
+    job_id: str
+    filename: Optional[str] = None
+    status: str  # queued, running, completed or failed
+    stage: str
+    events: List[CVJobEvent]
+    result: Optional[CVAnalysisResponse] = None
+    error: Optional[Dict[str, Any]] = None
+    created_at: str
+    updated_at: str
\ No newline at end of file
@@ -0,0 +1,112 @@
+# app/services/ann_index.py
+from typing import Callable, Optional
+
+import numpy as np
+
+# Rows assigned to centroids per step while clustering, to bound temporary memory
+ASSIGN_BLOCK_ROWS = 8192
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index over normalized vectors.
+
+    A spherical k-means coarse quantizer splits the rows into n_lists clusters.
+    A query scores the centroids, visits the n_probe closest lists and scores
+    only their rows, with a scoring function supplied by the caller. More
+    lists make each probe cheaper; more probes raise recall at the cost of
+    latency.
+    """
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_rows: np.ndarray):
+        self.centroids = centroids  # (n_lists, dim), normalized
+        self.list_offsets = list_offsets  # (n_lists + 1,), CSR offsets into list_rows
+        self.list_rows = list_rows  # (rows,), row ids grouped by list
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, n_lists: int = 0, iterations: int = 15, seed: int = 0) -> "IVFIndex":
+        """Cluster normalized embeddings; n_lists=0 picks roughly 4*sqrt(rows)."""
+        rows = len(embeddings)
+        if n_lists <= 0:
+            n_lists = int(4 * np.sqrt(rows))
+        n_lists = max(1, min(n_lists, rows))
+
+        rng = np.random.default_rng(seed)
+        centroids = np.array(embeddings[rng.choice(rows, size=n_lists, replace=False)], dtype=np.float32)
+        assignments = np.zeros(rows, dtype=np.int64)
+        for _ in range(iterations):
+            assignments = assign_to_centroids(embeddings, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, embeddings)
+            counts = np.bincount(assignments, minlength=n_lists)
+
+            # Re-seed empty lists from random rows so every list stays useful
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = embeddings[rng.choice(rows, size=int(empty.sum()), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        assignments = assign_to_centroids(embeddings, centroids)
+        list_rows = np.argsort(assignments, kind="stable")
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))])
+        return cls(centroids, list_offsets.astype(np.int64), list_rows.astype(np.int64))
+
+    def search(
+        self,
+        score_rows: Callable[[np.ndarray, np.ndarray], np.ndarray],
+        queries: np.ndarray,
+        k: int,
+        n_probe: int,
+    ):
+        """
+        Return (rows, scores) of the k best rows per normalized query, best first.
+        Lists are visited in centroid order until n_probe lists have been read
+        and at least k rows have been seen; score_rows(rows, query) scores the
+        rows visited for one query.
+        """
+        k = max(1, min(k, len(self.list_rows)))
+        list_order = np.argsort(-(queries @ self.centroids.T), axis=1)
+        result_rows = np.empty((len(queries), k), dtype=np.int64)
+        result_scores = np.empty((len(queries), k), dtype=np.float32)
+
+        for i, query in enumerate(queries):
+            candidates = []
+            seen = 0
+            for probed, list_id in enumerate(list_order[i]):
+                if probed >= n_probe and seen >= k:
+                    break
+                members = self.list_rows[self.list_offsets[list_id]:self.list_offsets[list_id + 1]]
+                candidates.append(members)
+                seen += len(members)
+            candidates = np.concatenate(candidates)
+            scores = score_rows(candidates, query)
+
+            top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+            top = top[np.argsort(-scores[top])]
+            result_rows[i] = candidates[top]
+            result_scores[i] = scores[top]
+        return result_rows, result_scores
+
+
+def assign_to_centroids(embeddings: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for every row."""
+    assignments = np.empty(len(embeddings), dtype=np.int64)
+    for start in range(0, len(embeddings), ASSIGN_BLOCK_ROWS):
+        block = np.asarray(embeddings[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def build_ann_index(backend: str, embeddings: np.ndarray, n_lists: int = 0) -> Optional[IVFIndex]:
+    """Build the configured ANN backend, or None for exact search."""
+    if backend == "exact" or not len(embeddings):
+        return None
+    if backend == "ivf":
+        return IVFIndex.build(embeddings, n_lists=n_lists)
+    raise ValueError(f"Unknown occupation index backend: {backend}")
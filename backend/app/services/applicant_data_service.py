@@ -1,17 +1,14 @@
 from typing import Dict, Any, Optional
 from app.db.supabase_client import get_supabase_client
-from openai import AsyncOpenAI
-import os
+from app.core.config import settings
+from app.services.cv_profile_service import extract_cv_profile, profile_client_data
+from app.models.applicant import ClientDataExtraction
+from app.services.model_router import routed_extraction
+from app.services.text_normalizer import prepare_cv_text
 import json
-from dotenv import load_dotenv
 from datetime import datetime
 from dateutil import parser
 
-# Load environment variables
-load_dotenv()
-
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 def format_date(date_str: str) -> Optional[str]:
     """Format date string to YYYY-MM-DD."""
     try:
@@ -24,54 +21,23 @@ async def extract_and_save_applicant_data(extracted_text: str, client_id: str) -
     Extract applicant data from CV text and save to database.
     Stores education and experience as JSONB in the clients table.
     """
-    try:
-        # Define extraction schema matching current database structure
-        extraction_schema = {
-            "personal": {
-                "full_name": "",
-                "email": "",
-                "phone": "",
-                "date_of_birth": "",
-                "nationality": ""
-            },
-            "education": [{
-                "level": "",
-                "field": "",
-                "institution": "",
-                "country": "",
-                "start_date": "",
-                "end_date": ""
-            }],
-            "experience": [{
-                "title": "",
-                "company": "",
-                "country": "",
-                "start_date": "",
-                "end_date": ""
-            }]
-        }
-
-        # Create system message for GPT
-        system_message = """Extract personal information, education, and work experience from the CV text.
-Rules:
-- Extract only explicitly stated information
-- Format dates as YYYY-MM-DD where possible
-- Leave fields empty if information is not found
-- For education and experience, list in reverse chronological order (most recent first)
-- Use "present" for current positions/education"""
+    update_data = await extract_client_update(extracted_text)
+    if update_data is None:
+        return None
+    return save_client_update(client_id, update_data)
 
-        # Get OpenAI response
-        response = await client.chat.completions.create(
-            model="gpt-4-1106-preview",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": f"Extract the following information from this CV into a JSON object:\n\n{json.dumps(extraction_schema, indent=2)}\n\nCV TEXT:\n{extracted_text}\n\nReturn only a valid JSON object matching the schema exactly."}
-            ],
-            response_format={"type": "json_object"}
-        )
 
-        # Parse the response
-        extracted_data = json.loads(response.choices[0].message.content)
+async def extract_client_update(extracted_text: str) -> Optional[Dict[str, Any]]:
+    """
+    The clients row update for a CV: non-empty personal fields plus education
+    and experience as JSONB. Returns None if extraction fails or finds nothing.
+    """
+    try:
+        if settings.LLM_EXTRACTION_MODE == "combined":
+            # Shares the one profile call made for this CV's occupation suggestions
+            extracted_data = profile_client_data(await extract_cv_profile(extracted_text))
+        else:
+            extracted_data = await request_client_data(extracted_text)
 
         # Process dates in education
         if "education" in extracted_data:
@@ -116,18 +82,77 @@ Rules:
             if valid_experience:
                 update_data["experience"] = valid_experience
 
-        # Update client record
-        if update_data:
-            result = get_supabase_client().table("clients").update(update_data).eq("id", client_id).execute()
-            
-            if not result.data:
-                print(f"Failed to update client record: {client_id}")
-                return None
-
-            return result.data[0]
+        return update_data or None
 
+    except Exception as e:
+        print(f"Error in extract_and_save_applicant_data: {str(e)}")
         return None
 
+
+def save_client_update(client_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Write an extracted update to the client record; returns the updated row."""
+    try:
+        result = get_supabase_client().table("clients").update(update_data).eq("id", client_id).execute()
+
+        if not result.data:
+            print(f"Failed to update client record: {client_id}")
+            return None
+
+        return result.data[0]
+
     except Exception as e:
-        print(f"Error in extract_and_save_applicant_data: {str(e)}")
-        return None
\ No newline at end of file
+        print(f"Error saving applicant data for client {client_id}: {str(e)}")
+        return None
+
+
+async def request_client_data(extracted_text: str) -> Dict[str, Any]:
+    """Ask the LLM for the client record fields (personal details, education, experience) in a CV."""
+    extracted_text, _ = prepare_cv_text(extracted_text)
+
+    # Define extraction schema matching current database structure
+    extraction_schema = {
+        "personal": {
+            "full_name": "",
+            "email": "",
+            "phone": "",
+            "date_of_birth": "",
+            "nationality": ""
+        },
+        "education": [{
+            "level": "",
+            "field": "",
+            "institution": "",
+            "country": "",
+            "start_date": "",
+            "end_date": ""
+        }],
+        "experience": [{
+            "title": "",
+            "company": "",
+            "country": "",
+            "start_date": "",
+            "end_date": ""
+        }]
+    }
+
+    # Create system message for GPT
+    system_message = """Extract personal information, education, and work experience from the CV text.
+Rules:
+- Extract only explicitly stated information
+- Format dates as YYYY-MM-DD where possible
+- Leave fields empty if information is not found
+- For education and experience, list in reverse chronological order (most recent first)
+- Use "present" for current positions/education"""
+
+    # Fast model first, escalating if the output is invalid or sparse
+    result = await routed_extraction(
+        "client_data",
+        ClientDataExtraction,
+        "gpt-4-1106-preview",
+        messages=[
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": f"Extract the following information from this CV into a JSON object:\n\n{json.dumps(extraction_schema, indent=2)}\n\nCV TEXT:\n{extracted_text}\n\nReturn only a valid JSON object matching the schema exactly."}
+        ],
+        deadline=settings.CV_APPLICANT_DATA_TIMEOUT_SECONDS,
+    )
+    return result.model_dump()
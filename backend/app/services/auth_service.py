@@ -151,7 +151,8 @@ async def create_user(email: str, password: str, full_name: Optional[str] = None
     return None
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+def decode_user_id(token: str) -> str:
+    """Validate a JWT and return the user id it was issued for."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -168,6 +169,21 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     
+    return user_id
+
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
+    """Authenticate from the token alone, without a users table lookup (for hot, read-only endpoints)."""
+    return decode_user_id(token)
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    user_id = decode_user_id(token)
+    
     result = get_supabase_client().table("users").select("*").eq(UserTable.id, user_id).execute()
     
     if not result.data or len(result.data) == 0:
@@ -0,0 +1,207 @@
+# app/services/cv_jobs.py
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings, resolve_data_path
+from app.db.local_cache import ExpiringSQLiteStore, LRUCache
+from app.services.cv_pipeline import process_cv
+from app.services.upload_service import SpooledUpload
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class CVJobQueue:
+    """
+    Background CV processing for uploads made with async_mode.
+
+    Jobs wait in an in-process asyncio queue drained by JOB_WORKERS worker
+    tasks. Every status change is written to a local SQLite store as well as
+    memory, so status polls and event streams can be answered by any worker
+    process sharing the data directory, not only the one running the job.
+    A record expires JOB_RETENTION_SECONDS after its last change, and the
+    store is trimmed to JOB_STORE_MAX_ENTRIES.
+    """
+
+    def __init__(self, path: str, workers: int, max_queued: int):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention_seconds = settings.JOB_RETENTION_SECONDS
+        self.memory = LRUCache(settings.JOB_HISTORY_SIZE)
+        self.disk = ExpiringSQLiteStore(resolve_data_path(path), "cv_jobs", self.retention_seconds, settings.JOB_STORE_MAX_ENTRIES)
+        self.completed = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers, then fail the jobs still queued and delete their uploads."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._queue is None:
+            return
+        while not self._queue.empty():
+            job_id, upload, _, _ = self._queue.get_nowait()
+            upload.close()
+            job = self._load(job_id)
+            if job is not None:
+                self._fail(job, 503, "The server stopped before this CV was processed, please upload it again")
+        self._queue = None
+
+    def submit(
+        self,
+        upload: SpooledUpload,
+        user_id: str,
+        client_id: Optional[str],
+        filename: str,
+        top_k: int,
+    ) -> Dict[str, Any]:
+        """Queue a spooled upload; the job owns the upload from here on. Raises 503 when the queue is full."""
+        if self._queue is None:
+            self.start()
+        now = datetime.now().isoformat()
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "filename": filename,
+            "status": "queued",
+            "stage": "queued",
+            "events": [{"stage": "queued", "at": now}],
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        try:
+            self._queue.put_nowait((job["job_id"], upload, client_id, top_k))
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="Too many CV processing jobs queued, try again shortly")
+        self._save(job)
+        return job
+
+    def get(self, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """The job record if it exists and belongs to the user."""
+        job = self._load(job_id)
+        if job is None or job["user_id"] != user_id:
+            return None
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": bool(self._tasks),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, upload, client_id, top_k = await self._queue.get()
+            try:
+                await self._run(job_id, upload, client_id, top_k)
+            finally:
+                upload.close()
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, upload: SpooledUpload, client_id: Optional[str], top_k: int) -> None:
+        job = self._load(job_id)
+        self._set_stage(job, "running", "started")
+        try:
+            result = await process_cv(
+                upload, job["user_id"], client_id, job["filename"], top_k,
+                on_stage=lambda stage: self._set_stage(job, "running", stage),
+            )
+        except asyncio.CancelledError:
+            self._fail(job, 503, "The server stopped while this CV was being processed, please upload it again")
+            raise
+        except HTTPException as e:
+            self._fail(job, e.status_code, e.detail)
+        except Exception as e:
+            print(f"CV job {job_id} failed: {e}")
+            self._fail(job, 500, f"Error processing CV: {str(e)}")
+        else:
+            self.completed += 1
+            job["result"] = result
+            self._set_stage(job, "completed", "completed")
+
+    def _fail(self, job: Dict[str, Any], status_code: int, detail: Any) -> None:
+        self.failed += 1
+        job["error"] = {"status_code": status_code, "detail": detail}
+        self._set_stage(job, "failed", "failed")
+
+    def _set_stage(self, job: Dict[str, Any], status: str, stage: str) -> None:
+        now = datetime.now().isoformat()
+        job["status"] = status
+        job["stage"] = stage
+        job["events"].append({"stage": stage, "at": now})
+        job["updated_at"] = now
+        self._save(job)
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        entry = self.memory.get(job_id)
+        if entry is not None and entry[0] > time.time():
+            return entry[1]
+        try:
+            stored = self.disk.get_many([job_id]).get(job_id)
+        except Exception as e:
+            print(f"Error reading CV job store: {e}")
+            return None
+        return json.loads(stored) if stored else None
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        self.memory.set(job["job_id"], (time.time() + self.retention_seconds, job))
+        try:
+            self.disk.set_many({job["job_id"]: json.dumps(job, default=str).encode()})
+        except Exception as e:
+            print(f"Error writing CV job store: {e}")
+
+
+async def job_events(job_id: str, user_id: str):
+    """
+    Server-sent events for a job: one 'stage' event per transition, then a
+    final 'completed' or 'failed' event carrying the result or error.
+    """
+    sent = 0
+    idle = 0.0
+    while True:
+        job = cv_jobs.get(job_id, user_id)
+        if job is None:
+            yield format_event("failed", {"status_code": 404, "detail": "Job not found"})
+            return
+
+        for event in job["events"][sent:]:
+            yield format_event("stage", event)
+            idle = 0.0
+        sent = len(job["events"])
+
+        if job["status"] in TERMINAL_STATUSES:
+            yield format_event(job["status"], job["result"] if job["status"] == "completed" else job["error"])
+            return
+
+        await asyncio.sleep(settings.JOB_EVENT_POLL_SECONDS)
+        idle += settings.JOB_EVENT_POLL_SECONDS
+        if idle >= 15:
+            yield ": keep-alive\n\n"  # Comment line stops proxies closing an idle stream
+            idle = 0.0
+
+
+def format_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+cv_jobs = CVJobQueue(settings.JOB_STORE_PATH, settings.JOB_WORKERS, settings.JOB_QUEUE_MAX_SIZE)
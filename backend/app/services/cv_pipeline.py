@@ -0,0 +1,365 @@
+# app/services/cv_pipeline.py
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
+
+from app.core.config import settings
+from app.db.supabase_client import get_supabase_client
+from app.services.applicant_data_service import extract_client_update, save_client_update
+from app.services.cv_profile_service import extract_cv_profile, profile_suggestions
+from app.services.document_cache import document_cache
+from app.services.document_processor import extract_document, ExtractionTimeoutError
+from app.services.llm_gateway import llm_user
+from app.services.occupation_matcher import match_occupations, match_occupation_batches
+from app.services.occupation_suggestion_llm_service import analyze_cv_with_llm
+from app.services.upload_service import SpooledUpload
+
+# PostgREST error code for a database function that does not exist
+FUNCTION_NOT_FOUND = "PGRST202"
+
+
+async def process_cv(
+    upload: SpooledUpload,
+    user_id: str,
+    client_id: Optional[str],
+    filename: str,
+    top_k: int,
+    on_stage: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Run the CV pipeline on a spooled upload and store the document.
+
+    After text extraction two branches run concurrently, each with its own
+    timeout: occupation suggestion followed by matching, and (for uploads
+    linked to a client) applicant data extraction. The caller must already
+    have checked that the client belongs to the user (check_client_owner);
+    its record is only updated once the suggestion branch has succeeded. A failed applicant data branch is reported in the result; a
+    failed suggestion branch fails the upload and leaves the client unchanged.
+    The upload is closed once its text has been extracted.
+
+    on_stage, if given, is called as the pipeline enters each stage:
+    extracting, suggesting, matching and saving.
+    """
+    llm_user.set(user_id)  # LLM calls below count against this user's concurrency limit
+    report_stage = on_stage or (lambda stage: None)
+    analysis_key, analysis, analysis_cached = await load_analysis(upload, report_stage)
+
+    extracted_text = analysis["extracted_text"]
+    branches = [
+        run_branch(
+            "occupation matching",
+            suggest_and_match(analysis_key, analysis, top_k, report_stage),
+            settings.CV_SUGGESTION_TIMEOUT_SECONDS,
+        )
+    ]
+    if client_id:
+        branches.append(run_branch(
+            "applicant data extraction",
+            extract_client_update(extracted_text),
+            settings.CV_APPLICANT_DATA_TIMEOUT_SECONDS,
+        ))
+    (suggestion_result, suggestion_error, timed_out), *applicant_branch = await asyncio.gather(*branches)
+    if suggestion_error:
+        raise HTTPException(status_code=504 if timed_out else 500, detail=f"Error in {suggestion_error}")
+    suggestions, occupation_matches = suggestion_result
+
+    warnings: List[str] = []
+    applicant_data = None
+    if applicant_branch:
+        update_data, error, _ = applicant_branch[0]
+        if error is None and update_data is None:
+            error = "applicant data extraction returned no data"
+        if error is None:
+            applicant_data = save_client_update(client_id, update_data)
+            if applicant_data is None:
+                error = "applicant data could not be saved to the client record"
+        if error:
+            print(f"Applicant data branch failed for client {client_id}: {error}")
+            warnings.append(error)
+
+    report_stage("saving")
+    document_id = save_document(
+        user_id, client_id, filename, upload, extracted_text, occupation_matches
+    )
+
+    # Return the results along with the document ID for reference
+    return {
+        "document_id": document_id,
+        "extracted_info": suggestions,
+        "occupation_matches": occupation_matches,
+        "extraction": analysis["extraction"],
+        "cached": analysis_cached,
+        "applicant_data": applicant_data,
+        "warnings": warnings,
+    }
+
+
+def check_client_owner(client_id: str, user_id: str) -> None:
+    """404 unless the client exists and belongs to the user."""
+    client_result = get_supabase_client().table("clients").select("id").eq("id", client_id).eq("user_id", user_id).execute()
+    if not client_result.data:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+
+async def load_analysis(upload: SpooledUpload, report_stage: Callable[[str], None]):
+    """
+    Cached analysis of the upload's bytes, or a fresh one holding only the
+    extracted text. Returns (analysis key, analysis, whether it was cached)
+    and closes the upload.
+    """
+    # A CV seen before under the same pipeline, prompt and model skips extraction and the LLM
+    analysis_key = document_cache.analysis_key(upload.sha256)
+    analysis = document_cache.get(analysis_key)
+    if analysis is not None:
+        upload.close()
+        return analysis_key, analysis, True
+
+    # Extract text from document
+    report_stage("extracting")
+    try:
+        extraction = await extract_document(upload.source(), upload.content_type)
+        extracted_text = extraction.pop("text")
+    except ExtractionTimeoutError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error extracting text: {str(e)}")
+    finally:
+        upload.close()
+    return analysis_key, {"extracted_text": extracted_text, "extraction": extraction, "suggestions": None}, False
+
+
+async def ensure_suggestions(analysis_key: str, analysis: Dict[str, Any], report_stage: Callable[[str], None]) -> List[str]:
+    """LLM occupation suggestions for the analysis, requested and cached only if missing."""
+    if analysis["suggestions"] is None:
+        # Process with LLM
+        report_stage("suggesting")
+        if settings.LLM_EXTRACTION_MODE == "combined":
+            analysis["suggestions"] = profile_suggestions(await extract_cv_profile(analysis["extracted_text"]))
+        else:
+            analysis["suggestions"] = await analyze_cv_with_llm(analysis["extracted_text"])
+        document_cache.set(analysis_key, analysis)
+    return analysis["suggestions"]
+
+
+async def run_branch(name: str, branch: Awaitable[Any], timeout: float) -> Tuple[Any, Optional[str], bool]:
+    """
+    Await one branch under its own timeout, so one branch's failure never
+    cancels the other. Returns (result, error message or None, timed out).
+    """
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(branch, timeout)
+    except asyncio.TimeoutError:
+        return None, f"{name} timed out after {timeout:g} seconds", True
+    except HTTPException as e:
+        return None, f"{name} failed: {e.detail}", False
+    except Exception as e:
+        return None, f"{name} failed: {str(e)}", False
+    print(f"{name} finished in {time.perf_counter() - started:.2f}s")
+    return result, None, False
+
+
+async def suggest_and_match(
+    analysis_key: str, analysis: Dict[str, Any], top_k: int, report_stage: Callable[[str], None]
+):
+    """Suggestion branch: LLM occupation suggestions (unless cached), then index matching."""
+    suggestions = await ensure_suggestions(analysis_key, analysis, report_stage)
+
+    # Match with occupations
+    report_stage("matching")
+    matches_key = document_cache.matches_key(analysis_key, top_k)
+    cached_matches = document_cache.get(matches_key)
+    if cached_matches is not None:
+        return suggestions, cached_matches["matches"]
+    occupation_matches = await match_occupations(suggestions, top_k=top_k)
+    document_cache.set(matches_key, {"matches": occupation_matches})
+    return suggestions, occupation_matches
+
+
+async def process_cv_batch(
+    entries: List[Tuple[str, Optional[SpooledUpload], Optional[str]]],
+    user_id: str,
+    top_k: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run many CVs through extraction and suggestion, BATCH_CONCURRENCY at a
+    time, and yield one result per file as it completes.
+
+    Files whose analyses finish within BATCH_MATCH_WINDOW_SECONDS of each
+    other are matched as a group: one embeddings request covers all their
+    titles, then their documents and matches are inserted with one bulk
+    request each. Applicant data is not extracted, since batch uploads are
+    not linked to a client. Every upload is closed once its text has been
+    extracted.
+    """
+    llm_user.set(user_id)
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def analyze(filename: str, upload: SpooledUpload):
+        async with semaphore:
+            try:
+                analysis_key, analysis, cached = await load_analysis(upload, lambda stage: None)
+                await asyncio.wait_for(
+                    ensure_suggestions(analysis_key, analysis, lambda stage: None),
+                    settings.CV_SUGGESTION_TIMEOUT_SECONDS,
+                )
+                return {"filename": filename, "upload": upload, "analysis_key": analysis_key, "analysis": analysis, "cached": cached}
+            except asyncio.TimeoutError:
+                return {"filename": filename, "error": f"occupation suggestion timed out after {settings.CV_SUGGESTION_TIMEOUT_SECONDS:g} seconds"}
+            except HTTPException as e:
+                return {"filename": filename, "error": e.detail}
+            except Exception as e:
+                return {"filename": filename, "error": str(e)}
+            finally:
+                upload.close()
+
+    for filename, upload, error in entries:
+        if error:
+            yield {"filename": filename, "status": "failed", "error": error}
+    pending = {asyncio.create_task(analyze(filename, upload)) for filename, upload, error in entries if not error}
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if pending:
+                # Let files finishing shortly after join the same embeddings request and inserts
+                more, pending = await asyncio.wait(pending, timeout=settings.BATCH_MATCH_WINDOW_SECONDS)
+                done |= more
+
+            group = []
+            for task in done:
+                item = task.result()
+                if "error" in item:
+                    yield {"filename": item["filename"], "status": "failed", "error": item["error"]}
+                else:
+                    group.append(item)
+            if group:
+                for line in await match_and_save_group(group, user_id, top_k):
+                    yield line
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def match_and_save_group(group: List[Dict[str, Any]], user_id: str, top_k: int) -> List[Dict[str, Any]]:
+    """Match a group of analysed CVs with one embeddings request and store them with bulk inserts."""
+    matches: List[Optional[List[Dict[str, Any]]]] = []
+    to_match = []
+    for item in group:
+        item["matches_key"] = document_cache.matches_key(item["analysis_key"], top_k)
+        cached_matches = document_cache.get(item["matches_key"])
+        matches.append(cached_matches["matches"] if cached_matches is not None else None)
+        if cached_matches is None:
+            to_match.append(len(matches) - 1)
+
+    try:
+        matched = await match_occupation_batches([group[i]["analysis"]["suggestions"] for i in to_match], top_k=top_k)
+    except Exception as e:
+        print(f"Error matching occupations for batch group: {e}")
+        return [{"filename": item["filename"], "status": "failed", "error": f"Error matching occupations: {str(e)}"} for item in group]
+    for i, occupation_matches in zip(to_match, matched):
+        matches[i] = occupation_matches
+        document_cache.set(group[i]["matches_key"], {"matches": occupation_matches})
+
+    documents = [
+        (document_row(user_id, None, item["filename"], item["upload"], item["analysis"]["extracted_text"]), occupation_matches)
+        for item, occupation_matches in zip(group, matches)
+    ]
+    try:
+        save_documents(documents)
+    except Exception as e:
+        print(f"Error saving batch group: {e}")
+        return [{"filename": item["filename"], "status": "failed", "error": f"Error saving document: {str(e)}"} for item in group]
+
+    return [
+        {
+            "filename": item["filename"],
+            "status": "completed",
+            "result": {
+                "document_id": document["id"],
+                "extracted_info": item["analysis"]["suggestions"],
+                "occupation_matches": occupation_matches,
+                "extraction": item["analysis"]["extraction"],
+                "cached": item["cached"],
+            },
+        }
+        for item, (document, occupation_matches) in zip(group, documents)
+    ]
+
+
+def document_row(
+    user_id: str,
+    client_id: Optional[str],
+    filename: str,
+    upload: SpooledUpload,
+    extracted_text: str,
+) -> Dict[str, Any]:
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "client_id": client_id,  # Link to client if provided
+        "filename": filename,
+        "file_type": upload.content_type,
+        "file_size": upload.size,
+        "extracted_text": extracted_text,
+        "created_at": datetime.now().isoformat(),
+        "updated_at": datetime.now().isoformat(),
+    }
+
+
+def match_rows(document_id: str, occupation_matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "document_id": document_id,
+            "anzsco_code": match.get("anzsco_code"),
+            "occupation_name": match.get("occupation_name"),
+            "confidence_score": match.get("confidence_score"),
+            "created_at": datetime.now().isoformat(),
+        }
+        for match in occupation_matches
+    ]
+
+
+def save_documents(documents: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]) -> None:
+    """
+    Insert document rows and all their occupation matches with a single call
+    to the save_documents database function (backend/sql/save_documents.sql).
+    Until that function is deployed, documents and matches are inserted with
+    one request each.
+    """
+    supabase_client = get_supabase_client()
+    document_rows = [document for document, _ in documents]
+    rows = [row for document, occupation_matches in documents for row in match_rows(document["id"], occupation_matches)]
+    try:
+        supabase_client.rpc("save_documents", {"documents": document_rows, "occupations": rows}).execute()
+        return
+    except APIError as e:
+        if e.code != FUNCTION_NOT_FOUND:
+            raise
+        print(f"save_documents function not found, inserting documents and matches separately: {e.message}")
+
+    supabase_client.table("documents").insert(document_rows).execute()
+
+    # Store occupation matches in a separate table
+    if rows:
+        supabase_client.table("document_occupations").insert(rows).execute()
+
+
+def save_document(
+    user_id: str,
+    client_id: Optional[str],
+    filename: str,
+    upload: SpooledUpload,
+    extracted_text: str,
+    occupation_matches: List[Dict[str, Any]],
+) -> str:
+    """Insert the document row and its occupation matches; returns the document id."""
+    document_data = document_row(user_id, client_id, filename, upload, extracted_text)
+    save_documents([(document_data, occupation_matches)])
+    return document_data["id"]
@@ -0,0 +1,143 @@
+# app/services/cv_profile_service.py
+import hashlib
+from typing import Any, Dict, List
+
+from app.models.applicant import CVProfileExtraction
+from app.services.model_router import routed_extraction
+from app.services.text_normalizer import prepare_cv_text
+
+CV_PROFILE_MODEL = "gpt-4o-mini"
+
+SYSTEM_PROMPT = "You are an expert Australian migration agent. You extract structured applicant data from CVs and identify suitable ANZSCO occupations, returning JSON only."
+
+USER_PROMPT_TEMPLATE = """Extract the applicant profile from the following CV and suggest 3-5 most suitable ANZSCO occupations for Australian skilled migration.
+
+Rules:
+- Extract only explicitly stated information; leave fields empty or null if not found
+- List education and experience in reverse chronological order (most recent first)
+- Use "present" as end_date for current positions or study
+- Give occupation names only, without ANZSCO codes
+
+Return a JSON object matching this schema exactly:
+{{
+  "personal": {{
+    "full_name": "",
+    "email": "",
+    "phone": "",
+    "date_of_birth": "YYYY-MM-DD", // or null
+    "age": null, // numeric age if date of birth not available
+    "nationality": ""
+  }},
+  "education": [
+    {{
+      "level": "", // phd, masters, bachelors, diploma, etc.
+      "field": "",
+      "institution": "",
+      "country": "",
+      "start_date": "YYYY-MM", // or null
+      "end_date": "YYYY-MM" // or "present" or null
+    }}
+  ],
+  "experience": [
+    {{
+      "title": "",
+      "company": "",
+      "country": "",
+      "start_date": "YYYY-MM", // or null
+      "end_date": "YYYY-MM", // or "present" if current
+      "duration_years": null // numeric duration if dates not clear
+    }}
+  ],
+  "english": {{
+    "level": "", // superior, proficient, competent, or null
+    "test": "", // IELTS, PTE, etc.
+    "scores": {{
+      "overall": null,
+      "reading": null,
+      "writing": null,
+      "speaking": null,
+      "listening": null
+    }}
+  }},
+  "occupations": ["", "", ""]
+}}
+
+CV TEXT:
+{cv_text}
+"""
+
+# Changes whenever the prompt wording changes, so cached and stored profiles are not reused
+PROMPT_VERSION = hashlib.sha256((SYSTEM_PROMPT + USER_PROMPT_TEMPLATE).encode()).hexdigest()[:12]
+
+
+async def extract_cv_profile(cv_text: str, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    One LLM call for everything the pipeline needs from a CV: personal
+    details, education, experience, English and ANZSCO occupation suggestions.
+
+    The request is deterministic, so every consumer of the same CV text
+    (suggestions, the client record, assessments) shares one call through
+    the gateway's response cache. The output is validated against
+    CVProfileExtraction. Raises on API errors or output no model got right.
+    """
+    cv_text, text_stats = prepare_cv_text(cv_text)
+    print(f"CV text prepared for profile extraction: {text_stats['tokens_before']} -> {text_stats['tokens_after']} tokens")
+
+    profile = await routed_extraction(
+        "cv_profile",
+        CVProfileExtraction,
+        CV_PROFILE_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": USER_PROMPT_TEMPLATE.format(cv_text=cv_text)}
+        ],
+        use_cache=use_cache,
+    )
+    return profile.model_dump()
+
+
+def profile_suggestions(profile: Dict[str, Any]) -> List[str]:
+    """The occupation suggestions, in the shape analyze_cv_with_llm returns."""
+    occupations = profile.get("occupations") or []
+    return [name.strip() for name in occupations if isinstance(name, str) and name.strip()][:5]
+
+
+def profile_client_data(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """The personal/education/experience fields stored on the client record."""
+    personal = profile.get("personal") or {}
+    return {
+        "personal": {
+            key: personal.get(key) or ""
+            for key in ("full_name", "email", "phone", "date_of_birth", "nationality")
+        },
+        "education": [
+            {key: edu.get(key) or "" for key in ("level", "field", "institution", "country", "start_date", "end_date")}
+            for edu in profile.get("education") or []
+        ],
+        "experience": [
+            {key: exp.get(key) or "" for key in ("title", "company", "country", "start_date", "end_date")}
+            for exp in profile.get("experience") or []
+        ],
+    }
+
+
+def profile_applicant_data(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """The applicant data used for points calculation, in the shape extract_applicant_data_from_cv returns."""
+    personal = profile.get("personal") or {}
+    experience = []
+    for exp in profile.get("experience") or []:
+        exp = dict(exp)
+        exp.setdefault("duration_years", None)
+        exp.setdefault("start_date", None)
+        exp.setdefault("end_date", None)
+        experience.append(exp)
+    english = profile.get("english") or {}
+    return {
+        "full_name": personal.get("full_name") or "",
+        "email": personal.get("email") or "",
+        "date_of_birth": personal.get("date_of_birth"),
+        "age": personal.get("age"),
+        "education": profile.get("education") or [],
+        "experience": experience,
+        "english": {"level": english.get("level"), "test": english.get("test"), "scores": english.get("scores") or {}} if english else {},
+    }
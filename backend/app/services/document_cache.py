@@ -0,0 +1,93 @@
+# app/services/document_cache.py
+import hashlib
+import json
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import settings, resolve_data_path
+from app.db.local_cache import ExpiringSQLiteStore, LRUCache
+from app.services.model_router import route_signature
+from app.services.cv_profile_service import CV_PROFILE_MODEL, PROMPT_VERSION as CV_PROFILE_PROMPT_VERSION
+from app.services.occupation_index import get_occupation_index
+from app.services.occupation_suggestion_llm_service import OCCUPATION_SUGGESTION_MODEL, PROMPT_VERSION
+
+# Bump when extraction or post-processing changes what a cached analysis would contain
+PIPELINE_VERSION = "4"
+
+
+class DocumentCache:
+    """
+    Content-addressed cache of CV pipeline results.
+
+    Analyses (extracted text and LLM suggestions) are keyed by the file's
+    SHA-256, the pipeline version, the prompt version and the model. Occupation
+    matches add the occupation index version, embedding model and top_k, so a
+    new index only re-runs matching, never the LLM. Entries hold applicant
+    data, so both tiers expire them after ttl_seconds and the file is trimmed
+    to max_entries.
+    """
+
+    def __init__(self, path: str, memory_size: int, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(memory_size)
+        self.disk = ExpiringSQLiteStore(resolve_data_path(path), "document_analyses", ttl_seconds, max_entries)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def analysis_key(self, file_sha256: str) -> str:
+        if settings.LLM_EXTRACTION_MODE == "combined":
+            return cache_key("analysis", file_sha256, PIPELINE_VERSION, "combined", CV_PROFILE_PROMPT_VERSION, route_signature(CV_PROFILE_MODEL))
+        return cache_key("analysis", file_sha256, PIPELINE_VERSION, PROMPT_VERSION, OCCUPATION_SUGGESTION_MODEL)
+
+    def matches_key(self, analysis_key: str, top_k: int) -> str:
+        # The index loads lazily; keying on its version before it exists would share None across index builds
+        return cache_key("matches", analysis_key, get_occupation_index().version, settings.EMBEDDING_MODEL, top_k)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.memory.get(key)
+        if entry is not None and entry[0] > time.time():
+            self.memory_hits += 1
+            return entry[1]
+        try:
+            stored = self.disk.get_many([key]).get(key)
+        except Exception as e:
+            print(f"Error reading document cache: {e}")
+            stored = None
+        if stored is None:
+            self.misses += 1
+            return None
+        value = json.loads(stored)
+        self.memory.set(key, (time.time() + self.ttl_seconds, value))
+        self.disk_hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.memory.set(key, (time.time() + self.ttl_seconds, value))
+        try:
+            self.disk.set_many({key: json.dumps(value).encode()})
+        except Exception as e:
+            print(f"Error writing document cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_evictions": self.disk.evictions,
+        }
+
+
+def cache_key(*parts: Any) -> str:
+    return hashlib.sha256(":".join(str(part) for part in parts).encode()).hexdigest()
+
+
+document_cache = DocumentCache(
+    settings.DOCUMENT_CACHE_PATH,
+    settings.DOCUMENT_CACHE_MEMORY_SIZE,
+    settings.DOCUMENT_CACHE_TTL_SECONDS,
+    settings.DOCUMENT_CACHE_MAX_ENTRIES,
+)
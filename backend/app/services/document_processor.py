@@ -1,49 +1,342 @@
+import asyncio
 import io
-from docx import Document
+import signal
+import threading
+import time
+import unicodedata
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, Any, List, Optional, Union
+
 from pypdf import PdfReader
 import pdfplumber
 
-async def extract_text_from_document(file_content: bytes, content_type: str) -> str:
-    """Extract text from PDF or DOCX files."""
-    if "pdf" in content_type:
-        return extract_text_from_pdf(file_content)
-    elif "docx" in content_type:
-        return extract_text_from_docx(file_content)
-    else:
-        raise ValueError(f"Unsupported content type: {content_type}")
+from app.core.config import settings
+from app.services.docx_extractor import extract_docx_text
 
-import io
-from pypdf import PdfReader
-import pdfplumber
+# Extra time the event loop waits beyond the in-worker deadline before giving up on a job
+TIMEOUT_GRACE_SECONDS = 5.0
+
+# A pypdf page is re-read with pdfplumber above this share of unreadable characters
+GARBLED_CHAR_RATIO = 0.1
+MIN_LETTER_RATIO = 0.2
+
+PDF_EXTRACTION_ERROR = "Error extracting text from PDF. Please try another file."
+
+# Separates PDF pages in extracted text, so normalization can tell running headers from content
+PAGE_BREAK = "\f"
+
+
+class ExtractionTimeoutError(Exception):
+    """Raised when text extraction takes longer than EXTRACTION_TIMEOUT_SECONDS."""
+
+
+class ExtractionMetrics:
+    """Queue depth and latency counters for the extraction pool."""
+
+    def __init__(self, window: int = 500):
+        self.queued = 0  # Submitted jobs not yet finished
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.latencies = deque(maxlen=window)  # Seconds from submission to result
+        self.run_times = deque(maxlen=window)  # Seconds spent parsing inside a worker
+        self.page_times = deque(maxlen=window)  # Seconds per extracted page
+        self.pages_by_method = Counter()  # Which extractor produced each page
+        self._lock = threading.Lock()
+
+    def started(self) -> None:
+        with self._lock:
+            self.queued += 1
+
+    def finished(
+        self,
+        latency: float,
+        run_time: Optional[float] = None,
+        outcome: str = "completed",
+        pages: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        with self._lock:
+            self.queued -= 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.latencies.append(latency)
+            if run_time is not None:
+                self.run_times.append(run_time)
+            for page in pages or []:
+                self.pages_by_method[page["method"]] += 1
+                self.page_times.append(page["seconds"])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            run_times = sorted(self.run_times)
+            page_times = sorted(self.page_times)
+            return {
+                "workers": settings.EXTRACTION_WORKERS,
+                "queue_depth": self.queued,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "latency_p50_ms": percentile_ms(latencies, 0.50),
+                "latency_p95_ms": percentile_ms(latencies, 0.95),
+                "run_time_p50_ms": percentile_ms(run_times, 0.50),
+                "run_time_p95_ms": percentile_ms(run_times, 0.95),
+                "page_time_p50_ms": percentile_ms(page_times, 0.50),
+                "page_time_p95_ms": percentile_ms(page_times, 0.95),
+                "pages_by_method": dict(self.pages_by_method),
+            }
 
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text from a PDF file using pypdf with pdfplumber as a fallback."""
+
+def percentile_ms(sorted_values, fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))] * 1000, 1)
+
+
+extraction_metrics = ExtractionMetrics()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """
+    Bounded process pool for CPU-heavy parsing. Workers are recycled after
+    EXTRACTION_MAX_TASKS_PER_WORKER jobs so parser memory growth cannot accumulate.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.EXTRACTION_WORKERS,
+                max_tasks_per_child=settings.EXTRACTION_MAX_TASKS_PER_WORKER,
+            )
+        return _pool
+
+
+def shutdown_extraction_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def extract_text_from_document(source: Union[bytes, str], content_type: str) -> str:
+    """Extract text from PDF or DOCX files in the extraction process pool."""
+    return (await extract_document(source, content_type))["text"]
+
+
+async def extract_document(source: Union[bytes, str], content_type: str) -> Dict[str, Any]:
+    """
+    Extract text plus per-page timing in the extraction process pool.
+
+    Returns {"text", "seconds", "pages"}, where each page entry records the page
+    number, the extractor that produced its text, its parse time and length.
+    """
+    # The DOCX MIME type is application/vnd.openxmlformats-officedocument.wordprocessingml.document
+    if "pdf" not in content_type and "docx" not in content_type and "wordprocessingml" not in content_type:
+        raise ValueError(f"Unsupported content type: {content_type}")
+
+    timeout = settings.EXTRACTION_TIMEOUT_SECONDS
+    extraction_metrics.started()
+    submitted = time.perf_counter()
     try:
-        # Primary extraction using pypdf
-        pdf = PdfReader(io.BytesIO(file_content))
-        text = "\n".join(page.extract_text() or "" for page in pdf.pages)
-        
-        if text.strip():  # Ensure extracted text is not empty
-            return text
+        if "pdf" in content_type:
+            job = extract_pdf_in_pool(source, timeout)
         else:
-            raise ValueError("pypdf extraction returned empty text.")
-    
+            job = run_in_pool(timeout, extract_docx_pages, source)
+        pages, run_time = await asyncio.wait_for(job, timeout + TIMEOUT_GRACE_SECONDS)
+    except (ExtractionTimeoutError, asyncio.TimeoutError):
+        extraction_metrics.finished(time.perf_counter() - submitted, outcome="timeouts")
+        raise ExtractionTimeoutError(f"Text extraction took longer than {timeout:.0f} seconds")
+    except Exception:
+        extraction_metrics.finished(time.perf_counter() - submitted, outcome="failed")
+        raise
+
+    latency = time.perf_counter() - submitted
+    extraction_metrics.finished(latency, run_time, pages=pages)
+
+    text = PAGE_BREAK.join(page.pop("text") for page in pages)
+    if "pdf" in content_type and not text.strip():
+        text = PDF_EXTRACTION_ERROR
+    return {"text": text, "seconds": round(latency, 4), "pages": pages}
+
+
+async def extract_pdf_in_pool(source: Union[bytes, str], timeout: float):
+    """
+    Parse the first page range, then fan the remaining ranges of a long PDF out
+    across the pool. Returns (pages, total seconds spent parsing in workers).
+    """
+    chunk = max(1, settings.EXTRACTION_PAGES_PER_JOB)
+    max_pages = settings.EXTRACTION_MAX_PAGES
+    first_chunk = min(chunk, max_pages) if max_pages else chunk
+    (pages, page_count), run_time = await run_in_pool(timeout, extract_pdf_pages, source, 0, first_chunk)
+
+    last_page = min(page_count, max_pages) if max_pages else page_count
+    jobs = [
+        run_in_pool(timeout, extract_pdf_pages, source, start, min(start + chunk, last_page))
+        for start in range(chunk, last_page, chunk)
+    ]
+    for (chunk_pages, _), chunk_time in await asyncio.gather(*jobs):
+        pages.extend(chunk_pages)
+        run_time += chunk_time
+    return pages, run_time
+
+
+def run_in_pool(timeout: float, func, *args):
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(get_extraction_pool(), run_extraction_job, timeout, func, *args)
+
+
+def run_extraction_job(timeout: float, func, *args):
+    """
+    Worker-side entry point: run func under a SIGALRM deadline, so a
+    pathological file is interrupted inside the worker and the worker is reused.
+    Returns (result, seconds spent parsing).
+    """
+    def on_timeout(signum, frame):
+        raise ExtractionTimeoutError(f"Text extraction took longer than {timeout:.0f} seconds")
+
+    started = time.perf_counter()
+    use_alarm = hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        result = func(*args)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return result, time.perf_counter() - started
+
+
+def looks_garbled(text: str) -> bool:
+    """
+    True for text typical of fonts without a usable ToUnicode map: replacement
+    or private-use characters, control codes, or almost no letters at all.
+    """
+    stripped = "".join(text.split())
+    if not stripped:
+        return False
+    unreadable = sum(
+        1 for ch in stripped
+        if ch == "\ufffd" or "\ue000" <= ch <= "\uf8ff" or unicodedata.category(ch) == "Cc"
+    )
+    letters = sum(1 for ch in stripped if ch.isalpha())
+    return unreadable / len(stripped) > GARBLED_CHAR_RATIO or letters / len(stripped) < MIN_LETTER_RATIO
+
+
+def open_source(source: Union[bytes, str]) -> BinaryIO:
+    """A readable stream over upload bytes or a spooled upload's file path."""
+    return open(source, "rb") if isinstance(source, str) else io.BytesIO(source)
+
+
+def extract_pdf_pages(source: Union[bytes, str], first_page: int = 0, last_page: Optional[int] = None):
+    """
+    Extract pages [first_page, last_page) one at a time with pypdf, re-reading
+    only empty or garbled pages with pdfplumber. Returns (pages, page count).
+    """
+    stream = open_source(source)
+    try:
+        return read_pdf_pages(source, stream, first_page, last_page)
+    finally:
+        stream.close()
+
+
+def read_pdf_pages(source: Union[bytes, str], stream: BinaryIO, first_page: int, last_page: Optional[int]):
+    try:
+        reader = PdfReader(stream)
+        page_count = len(reader.pages)
+    except ExtractionTimeoutError:
+        raise
     except Exception as e:
-        print(f"Error extracting PDF text with pypdf: {str(e)}")
-    
-    # Fallback extraction using pdfplumber
+        print(f"Error opening PDF with pypdf: {str(e)}")
+        reader = None
+        page_count = None
+
+    plumber = None
+    pages = []
+    if reader is None:
+        # If pdfplumber cannot open it either there are no pages, reported as PDF_EXTRACTION_ERROR
+        try:
+            plumber = pdfplumber.open(source if isinstance(source, str) else io.BytesIO(source))
+            page_count = len(plumber.pages)
+        except ExtractionTimeoutError:
+            raise
+        except Exception as e:
+            print(f"Error opening PDF with pdfplumber: {str(e)}")
+            if plumber is not None:
+                plumber.close()
+            return pages, 0
+    try:
+        last_page = page_count if last_page is None else min(last_page, page_count)
+
+        for number in range(first_page, last_page):
+            started = time.perf_counter()
+            text, method = "", "pypdf"
+            if reader is not None:
+                try:
+                    text = reader.pages[number].extract_text() or ""
+                except ExtractionTimeoutError:
+                    raise
+                except Exception as e:
+                    print(f"Error extracting PDF page {number + 1} with pypdf: {str(e)}")
+
+            if not text.strip() or looks_garbled(text):
+                try:
+                    if plumber is None:
+                        plumber = pdfplumber.open(source if isinstance(source, str) else io.BytesIO(source))
+                    fallback = plumber.pages[number].extract_text() or ""
+                    if fallback.strip() and (not text.strip() or not looks_garbled(fallback)):
+                        text, method = fallback, "pdfplumber"
+                    elif not text.strip():
+                        method = "empty"
+                except ExtractionTimeoutError:
+                    raise
+                except Exception as e:
+                    print(f"Fallback extraction of PDF page {number + 1} failed: {str(e)}")
+                    method = method if text.strip() else "empty"
+
+            pages.append({
+                "page": number + 1,
+                "method": method,
+                "seconds": round(time.perf_counter() - started, 4),
+                "chars": len(text),
+                "text": text,
+            })
+    finally:
+        if plumber is not None:
+            plumber.close()
+
+    return pages, page_count
+
+
+def extract_text_from_pdf(source: Union[bytes, str], max_pages: Optional[int] = None) -> str:
+    """Extract text from a PDF file page by page, using pdfplumber only for pages pypdf cannot read."""
     try:
-        with pdfplumber.open(io.BytesIO(file_content)) as pdf:
-            text = "\n".join(page.extract_text() or "" for page in pdf.pages)
-            return text if text.strip() else "Error extracting text from PDF. Please try another file."
-    
-    except Exception as e2:
-        print(f"Fallback PDF extraction also failed: {str(e2)}")
-        return "Error extracting text from PDF. Please try another file."
-
-
-def extract_text_from_docx(file_content: bytes) -> str:
-    print
-    """Extract text from DOCX file."""
-    doc = Document(io.BytesIO(file_content))
-    return "\n".join([paragraph.text for paragraph in doc.paragraphs])
+        pages, _ = extract_pdf_pages(source, 0, max_pages)
+    except ExtractionTimeoutError:
+        raise
+    except Exception as e:
+        print(f"PDF extraction failed: {str(e)}")
+        return PDF_EXTRACTION_ERROR
+    text = PAGE_BREAK.join(page["text"] for page in pages)
+    return text if text.strip() else PDF_EXTRACTION_ERROR
+
+
+def extract_docx_pages(source: Union[bytes, str]):
+    """DOCX has no pages; the whole document is reported as a single entry."""
+    started = time.perf_counter()
+    text = extract_text_from_docx(source)
+    return [{
+        "page": 1,
+        "method": "docx-xml",
+        "seconds": round(time.perf_counter() - started, 4),
+        "chars": len(text),
+        "text": text,
+    }]
+
+
+def extract_text_from_docx(source: Union[bytes, str]) -> str:
+    """Extract text from DOCX file, including tables, headers and text boxes."""
+    return extract_docx_text(source)
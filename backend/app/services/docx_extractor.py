@@ -0,0 +1,122 @@
+# app/services/docx_extractor.py
+import io
+import re
+import zipfile
+from typing import Iterator, List, Union
+from xml.etree.ElementTree import iterparse
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+PARAGRAPH, TEXT, ROW, CELL, TABLE = W + "p", W + "t", W + "tr", W + "tc", W + "tbl"
+# Run children that stand for a character
+RUN_CHARACTERS = {W + "tab": "\t", W + "br": "\n", W + "cr": "\n", W + "noBreakHyphen": "-"}
+
+DOCUMENT_PART = "word/document.xml"
+HEADER_PART = re.compile(r"^word/header(\d*)\.xml$")
+FOOTER_PART = re.compile(r"^word/footer(\d*)\.xml$")
+
+# Separator between table cells on one output line
+CELL_SEPARATOR = " | "
+
+
+def extract_docx_text(source: Union[bytes, str]) -> str:
+    """
+    Text of a DOCX in reading order: headers, body (tables and text boxes
+    included), then footers. Parts are streamed from the zip, so memory stays
+    bounded by the longest paragraph rather than the document size.
+    Accepts the file bytes or a path.
+    """
+    with zipfile.ZipFile(source if isinstance(source, str) else io.BytesIO(source)) as archive:
+        names = archive.namelist()
+        if DOCUMENT_PART not in names:
+            raise ValueError("DOCX file has no word/document.xml")
+
+        lines: List[str] = []
+        seen_margins = set()  # First-page/even-page headers usually repeat the default one
+        for part in sorted_parts(names, HEADER_PART):
+            for line in iter_part_lines(archive, part):
+                if line.strip() and line not in seen_margins:
+                    seen_margins.add(line)
+                    lines.append(line)
+        lines.extend(iter_part_lines(archive, DOCUMENT_PART))
+        for part in sorted_parts(names, FOOTER_PART):
+            for line in iter_part_lines(archive, part):
+                if line.strip() and line not in seen_margins:
+                    seen_margins.add(line)
+                    lines.append(line)
+    return "\n".join(lines)
+
+
+def sorted_parts(names: List[str], pattern) -> List[str]:
+    """Header or footer parts in numeric order (header1, header2, ..., header10)."""
+    numbered = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            numbered.append((int(match.group(1) or 0), name))
+    return [name for _, name in sorted(numbered)]
+
+
+def iter_part_lines(archive: zipfile.ZipFile, part: str) -> Iterator[str]:
+    """
+    One line per paragraph, one line per table row with cells joined by
+    CELL_SEPARATOR. Text box paragraphs are yielded just before the paragraph
+    that anchors them.
+    """
+    paragraphs: List[List[str]] = []  # Runs of the open paragraphs (text boxes nest them)
+    cells: List[List[str]] = []  # Paragraph texts of the open table cells
+    rows: List[List[str]] = []  # Cell texts of the open table rows
+    skipping = 0  # Inside mc:Fallback, which repeats text box content for old readers
+    open_elements = []  # Path from the root to the element being parsed
+
+    with archive.open(part) as stream:
+        for event, elem in iterparse(stream, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                open_elements.append(elem)
+                if tag == MC_FALLBACK:
+                    skipping += 1
+                elif skipping:
+                    continue
+                elif tag == PARAGRAPH:
+                    paragraphs.append([])
+                elif tag == CELL:
+                    cells.append([])
+                elif tag == ROW:
+                    rows.append([])
+                continue
+
+            open_elements.pop()
+            if tag == MC_FALLBACK:
+                skipping -= 1
+                elem.clear()
+                continue
+            if skipping or (not paragraphs and tag not in (CELL, ROW)):
+                continue
+
+            if tag == TEXT:
+                paragraphs[-1].append(elem.text or "")
+            elif tag in RUN_CHARACTERS:
+                paragraphs[-1].append(RUN_CHARACTERS[tag])
+            elif tag == PARAGRAPH:
+                text = "".join(paragraphs.pop())
+                if cells:
+                    cells[-1].append(text)
+                else:
+                    yield text
+                elem.clear()
+            elif tag == CELL:
+                text = " ".join(line.strip() for line in cells.pop() if line.strip())
+                rows[-1].append(text)
+            elif tag == ROW:
+                line = CELL_SEPARATOR.join(cell for cell in rows.pop() if cell)
+                if cells:  # Nested table
+                    cells[-1].append(line)
+                elif line:
+                    yield line
+                elem.clear()
+
+            # Finished top-level blocks are dropped from their parent (w:body, or a
+            # content control) so the parsed tree never grows
+            if not paragraphs and not cells and tag in (PARAGRAPH, ROW, TABLE) and open_elements:
+                open_elements[-1].clear()
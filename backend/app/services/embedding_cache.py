@@ -0,0 +1,107 @@
+# app/services/embedding_cache.py
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings, resolve_data_path
+from app.db.local_cache import ExpiringSQLiteStore, LRUCache
+
+
+def normalize_title(text: str) -> str:
+    """Case- and whitespace-insensitive form of an occupation title."""
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache for text embeddings: an in-process LRU in front of a local
+    SQLite store. Keys combine the embedding model with the normalized text, so
+    changing models never serves stale vectors. The SQLite file expires
+    entries after ttl_seconds and is trimmed to max_entries.
+    """
+
+    def __init__(self, path: str, memory_size: int, ttl_seconds: float, max_entries: int):
+        self.memory = LRUCache(memory_size)
+        self.disk = ExpiringSQLiteStore(resolve_data_path(path), "embeddings", ttl_seconds, max_entries)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.api_calls = 0
+
+    async def get_embeddings(
+        self,
+        texts: List[str],
+        model: str,
+        fetch: Callable[[List[str]], Awaitable[Optional[List[List[float]]]]],
+    ) -> Optional[List[List[float]]]:
+        """
+        Return one embedding per text. Only texts missing from both tiers are
+        passed to `fetch`, in a single batch. Returns None if that call fails.
+        """
+        keys = [f"{model}:{normalize_title(text)}" for text in texts]
+        found: Dict[str, List[float]] = {}
+
+        for key in keys:
+            embedding = self.memory.get(key)
+            if embedding is not None:
+                found[key] = embedding
+        memory_keys = set(found)
+
+        disk_keys = [key for key in dict.fromkeys(keys) if key not in found]
+        try:
+            disk_values = self.disk.get_many(disk_keys)
+        except Exception as e:
+            print(f"Error reading embedding cache: {e}")
+            disk_values = {}
+        for key, value in disk_values.items():
+            embedding = np.frombuffer(value, dtype=np.float32).tolist()
+            self.memory.set(key, embedding)
+            found[key] = embedding
+
+        for key in keys:
+            if key in memory_keys:
+                self.memory_hits += 1
+            elif key in found:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+
+        # Duplicate titles in one request are fetched once
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            self.api_calls += 1
+            fetched = await fetch(list(missing.values()))
+            if fetched is None:
+                return None
+            new_entries = {}
+            for key, embedding in zip(missing.keys(), fetched):
+                embedding = list(embedding)
+                self.memory.set(key, embedding)
+                new_entries[key] = np.asarray(embedding, dtype=np.float32).tobytes()
+                found[key] = embedding
+            try:
+                self.disk.set_many(new_entries)
+            except Exception as e:
+                print(f"Error writing embedding cache: {e}")
+
+        return [found[key] for key in keys]
+
+    def stats(self) -> Dict[str, int]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "api_calls": self.api_calls,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_evictions": self.disk.evictions,
+        }
+
+
+embedding_cache = EmbeddingCache(
+    settings.EMBEDDING_CACHE_PATH,
+    settings.EMBEDDING_CACHE_MEMORY_SIZE,
+    settings.EMBEDDING_CACHE_TTL_SECONDS,
+    settings.EMBEDDING_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,106 @@
+# app/services/lexical_index.py
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Any
+
+# Suffixes and qualifiers ANZSCO adds that LLM suggestions usually leave out
+NEC_SUFFIX = re.compile(r"\bnec$")
+PARENTHETICAL = re.compile(r"\s*\([^)]*\)")
+
+
+def normalize_name(name: str) -> str:
+    """Lower-case, spell out '&', drop punctuation and collapse whitespace."""
+    name = name.lower().replace("&", " and ")
+    name = re.sub(r"[^a-z0-9()\s]", " ", name)
+    return " ".join(name.split())
+
+
+def token_key(normalized: str) -> str:
+    """Order-insensitive form, so 'engineer software' finds 'software engineer'."""
+    return " ".join(sorted(normalized.replace("(", " ").replace(")", " ").split()))
+
+
+def trigrams(normalized: str) -> Set[str]:
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LexicalIndex:
+    """
+    Exact and near-exact lookup of occupation titles.
+
+    Built once from the index metadata: a map of normalized names and unambiguous
+    aliases to occupation rows, plus a trigram inverted index for small spelling
+    or plural differences.
+    """
+
+    def __init__(self, occupations: List[Dict[str, Any]], threshold: float = 0.9):
+        self.threshold = threshold
+        self.names: Dict[str, int] = {}
+        self.trigrams: List[Set[str]] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+
+        aliases: Dict[str, Set[int]] = defaultdict(set)
+        for row, occupation in enumerate(occupations):
+            normalized = normalize_name(occupation.get("occupation_name") or "")
+            if normalized in self.names:  # Further vectors of an occupation already indexed
+                self.trigrams.append(set())
+                continue
+            self.names[normalized] = row
+            for alias in name_aliases(normalized):
+                aliases[alias].add(row)
+
+            grams = trigrams(normalized)
+            self.trigrams.append(grams)
+            for gram in grams:
+                self.postings[gram].append(row)
+
+        # An alias shared by several occupations is not a reliable match
+        for alias, rows in aliases.items():
+            if len(rows) == 1 and alias not in self.names:
+                self.names[alias] = next(iter(rows))
+
+    def lookup(self, title: str) -> Optional[int]:
+        """Return the occupation row for an exact or near-exact title, else None."""
+        normalized = normalize_name(title)
+        if not normalized:
+            return None
+
+        for key in (normalized, token_key(normalized)):
+            if key in self.names:
+                return self.names[key]
+
+        return self._closest_by_trigrams(normalized)
+
+    def _closest_by_trigrams(self, normalized: str) -> Optional[int]:
+        query = trigrams(normalized)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in query:
+            for row in self.postings.get(gram, ()):
+                shared[row] += 1
+
+        best_row, best_score, runner_up = None, 0.0, 0.0
+        for row, count in shared.items():
+            score = 2 * count / (len(query) + len(self.trigrams[row]))  # Dice coefficient
+            if score > best_score:
+                best_row, best_score, runner_up = row, score, best_score
+            elif score > runner_up:
+                runner_up = score
+
+        # Ties between two close titles are left to the embedding path
+        if best_score >= self.threshold and best_score > runner_up:
+            return best_row
+        return None
+
+
+def name_aliases(normalized: str) -> Set[str]:
+    """Alternative spellings of an ANZSCO name that should resolve to it."""
+    aliases = {token_key(normalized)}
+    without_qualifier = PARENTHETICAL.sub("", normalized).strip()
+    without_nec = NEC_SUFFIX.sub("", without_qualifier).strip()
+    for alias in (without_qualifier, without_nec):
+        if alias:
+            aliases.add(alias)
+            aliases.add(token_key(alias))
+    aliases.discard(normalized)
+    return aliases
@@ -0,0 +1,118 @@
+# app/services/llm_cache.py
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import settings, resolve_data_path
+from app.db.local_cache import ExpiringSQLiteStore, LRUCache
+
+
+class LLMResponseCache:
+    """
+    Cache of chat completion responses for deterministic requests.
+
+    Only requests with temperature 0 and JSON output are cached, since those
+    are the ones expected to return the same answer again, and only responses
+    that finished normally (see is_complete). The key hashes the
+    model, messages, temperature and response_format. Entries live in an
+    in-process LRU in front of a local SQLite file; both honour
+    LLM_CACHE_TTL_SECONDS, and the file is trimmed to LLM_CACHE_MAX_ENTRIES.
+    """
+
+    def __init__(self, path: str, memory_size: int, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(memory_size)
+        self.disk = ExpiringSQLiteStore(resolve_data_path(path), "llm_responses", ttl_seconds, max_entries)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.prompt_tokens_saved = 0
+        self.completion_tokens_saved = 0
+        self._lock = threading.Lock()
+
+    def key(self, request: Dict[str, Any]) -> Optional[str]:
+        """Cache key for a chat request, or None if the request is not deterministic."""
+        if not settings.LLM_CACHE_ENABLED or not is_deterministic(request):
+            return None
+        fields = {name: request.get(name) for name in ("model", "messages", "temperature", "response_format")}
+        return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The stored response as a dict, counting the tokens a hit saved."""
+        entry = self.memory.get(key)
+        if entry is not None and entry[0] > time.time():
+            response = entry[1]
+            self._hit("memory_hits", response)
+            return response
+
+        try:
+            stored = self.disk.get_many([key]).get(key)
+        except Exception as e:
+            print(f"Error reading LLM response cache: {e}")
+            stored = None
+        if stored is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        response = json.loads(stored)
+        self.memory.set(key, (time.time() + self.ttl_seconds, response))
+        self._hit("disk_hits", response)
+        return response
+
+    def set(self, key: str, response: Dict[str, Any]) -> None:
+        self.memory.set(key, (time.time() + self.ttl_seconds, response))
+        try:
+            self.disk.set_many({key: json.dumps(response).encode()})
+        except Exception as e:
+            print(f"Error writing LLM response cache: {e}")
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        try:
+            self.disk.delete_many([key])
+        except Exception as e:
+            print(f"Error deleting from LLM response cache: {e}")
+
+    def _hit(self, tier: str, response: Dict[str, Any]) -> None:
+        usage = response.get("usage") or {}
+        with self._lock:
+            setattr(self, tier, getattr(self, tier) + 1)
+            self.prompt_tokens_saved += usage.get("prompt_tokens") or 0
+            self.completion_tokens_saved += usage.get("completion_tokens") or 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "enabled": settings.LLM_CACHE_ENABLED,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "disk_evictions": self.disk.evictions,
+                "prompt_tokens_saved": self.prompt_tokens_saved,
+                "completion_tokens_saved": self.completion_tokens_saved,
+            }
+
+
+def is_deterministic(request: Dict[str, Any]) -> bool:
+    """Temperature 0 and JSON mode; other requests are expected to vary between calls."""
+    response_format = request.get("response_format") or {}
+    return request.get("temperature") == 0 and response_format.get("type") in ("json_object", "json_schema")
+
+
+def is_complete(response: Dict[str, Any]) -> bool:
+    """Every choice stopped on its own; output cut off at max_tokens or filtered is not reused."""
+    choices = response.get("choices") or []
+    return bool(choices) and all(choice.get("finish_reason") == "stop" for choice in choices)
+
+
+llm_cache = LLMResponseCache(
+    settings.LLM_CACHE_PATH,
+    settings.LLM_CACHE_MEMORY_SIZE,
+    settings.LLM_CACHE_TTL_SECONDS,
+    settings.LLM_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,239 @@
+# app/services/llm_gateway.py
+import asyncio
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+
+from app.core.config import settings
+from app.services.document_processor import percentile_ms
+from app.services.llm_cache import is_complete, llm_cache
+
+# User the current request is made for; set at the entry points so LLM calls
+# deep in the pipeline count against that user's concurrency limit
+llm_user: ContextVar[Optional[str]] = ContextVar("llm_user", default=None)
+
+
+class LLMDeadlineError(TimeoutError):
+    """An LLM call, including queueing and retries, ran past its deadline."""
+
+
+class LLMGateway:
+    """
+    The single way services reach OpenAI, for chat completions and embeddings.
+
+    One pooled AsyncOpenAI client is shared by every caller in the worker.
+    Each attempt waits for a slot under a global limit and a per-user limit.
+    429 and 5xx responses and connection errors are retried with jittered
+    exponential backoff, slept without holding a slot. The whole call, queueing and retries included, must finish
+    within its deadline. Latency and token usage are recorded per model.
+    """
+
+    def __init__(self, max_concurrency: int, per_user_concurrency: int, max_retries: int):
+        self.client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=0,  # Retries happen here, inside the deadline
+            timeout=settings.OPENAI_TIMEOUT_SECONDS,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS,
+                ),
+                timeout=settings.OPENAI_TIMEOUT_SECONDS,
+            ),
+        )
+        self.max_retries = max_retries
+        self.per_user_concurrency = per_user_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._user_slots: Dict[str, list] = {}  # user id -> [semaphore, callers holding or waiting]
+        self._in_flight: Dict[str, asyncio.Future] = {}  # cache key -> call shared by identical requests
+        self.metrics = LLMMetrics()
+
+    async def chat(
+        self,
+        deadline: Optional[float] = None,
+        user_id: Optional[str] = None,
+        use_cache: bool = True,
+        **request: Any,
+    ):
+        """
+        chat.completions.create through the gateway; returns the ChatCompletion.
+        Deterministic requests are answered from llm_cache when possible, and
+        identical ones already in flight share that call rather than making
+        their own. use_cache=False skips both but still stores the fresh response.
+        Only complete responses are stored; a caller that cannot use a stored
+        response (invalid JSON, failed validation) should discard() it.
+        """
+        key = llm_cache.key(request)
+        if key is None:
+            return await self._call("chat", request["model"], self.client.chat.completions.create, request, deadline, user_id)
+
+        if use_cache:
+            # from_cache marks responses this caller did not pay for
+            cached = llm_cache.get(key)
+            if cached is not None:
+                return ChatCompletion.model_validate({**cached, "from_cache": True})
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                return (await asyncio.shield(in_flight)).model_copy(update={"from_cache": True})
+
+        task = asyncio.ensure_future(self._call_and_cache(key, request, deadline, user_id))
+        if use_cache:
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish_in_flight(key, done))
+        # Shielded so one caller cancelling does not fail the others sharing the call
+        return await asyncio.shield(task)
+
+    async def _call_and_cache(self, key: str, request: Dict[str, Any], deadline: Optional[float], user_id: Optional[str]):
+        response = await self._call("chat", request["model"], self.client.chat.completions.create, request, deadline, user_id)
+        stored = response.model_dump(mode="json")
+        if is_complete(stored):
+            llm_cache.set(key, stored)
+        return response
+
+    def discard(self, **request: Any) -> None:
+        """Drop the cached response for a chat request, so the next identical call asks the API again."""
+        key = llm_cache.key(request)
+        if key is not None:
+            llm_cache.delete(key)
+
+    def _finish_in_flight(self, key: str, task: asyncio.Future) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here so an error nobody awaited is not logged as unhandled
+
+    async def embeddings(self, deadline: Optional[float] = None, user_id: Optional[str] = None, **request: Any):
+        """embeddings.create through the gateway; returns the CreateEmbeddingResponse."""
+        return await self._call("embeddings", request["model"], self.client.embeddings.create, request, deadline, user_id)
+
+    async def _call(
+        self,
+        kind: str,
+        model: str,
+        create: Callable[..., Awaitable[Any]],
+        request: Dict[str, Any],
+        deadline: Optional[float],
+        user_id: Optional[str],
+    ):
+        deadline = deadline or settings.LLM_DEADLINE_SECONDS
+        user_id = user_id or llm_user.get()
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self._attempts(create, request, user_id, started + deadline), deadline)
+        except asyncio.TimeoutError:
+            self.metrics.finished(kind, model, time.perf_counter() - started, "timeouts")
+            raise LLMDeadlineError(f"{kind} call to {model} exceeded its {deadline:g} second deadline")
+        except Exception:
+            self.metrics.finished(kind, model, time.perf_counter() - started, "failures")
+            raise
+        self.metrics.finished(kind, model, time.perf_counter() - started, "completed", getattr(response, "usage", None))
+        return response
+
+    async def _attempts(self, create: Callable[..., Awaitable[Any]], request: Dict[str, Any], user_id: Optional[str], ends_at: float):
+        attempt = 0
+        while True:
+            # Slots are held per attempt and released during backoff, so waiting retries do not block other callers
+            try:
+                async with self._user_slot(user_id), self._semaphore:
+                    return await create(**request, timeout=max(ends_at - time.perf_counter(), 0.1))
+            except (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = retry_delay(attempt, e)
+                if time.perf_counter() + delay >= ends_at:
+                    raise
+                attempt += 1
+                self.metrics.retried()
+                print(f"Retrying LLM call after {type(e).__name__} (attempt {attempt}, {delay:.2f}s)")
+                await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def _user_slot(self, user_id: Optional[str]):
+        """Hold one of the user's concurrency slots; a user's semaphore is dropped once nobody uses it."""
+        if user_id is None:
+            yield
+            return
+        slots = self._user_slots.setdefault(user_id, [asyncio.Semaphore(self.per_user_concurrency), 0])
+        slots[1] += 1
+        try:
+            async with slots[0]:
+                yield
+        finally:
+            slots[1] -= 1
+            if slots[1] == 0:
+                del self._user_slots[user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": settings.LLM_MAX_CONCURRENCY,
+            "max_concurrency_per_user": self.per_user_concurrency,
+            "active_users": len(self._user_slots),
+            "in_flight_shared": len(self._in_flight),
+            **self.metrics.stats(),
+        }
+
+
+def retry_delay(attempt: int, error: Exception) -> float:
+    """Full-jitter exponential backoff, never shorter than a Retry-After the API sent."""
+    delay = random.uniform(0, min(settings.LLM_RETRY_MAX_SECONDS, settings.LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            delay = max(delay, float(response.headers.get("retry-after", 0)))
+        except ValueError:
+            pass
+    return delay
+
+
+class LLMMetrics:
+    """Call counts, latency and token usage per call kind and model."""
+
+    def __init__(self, window: int = 500):
+        self.calls = Counter()
+        self.retries = 0
+        self.prompt_tokens = Counter()
+        self.completion_tokens = Counter()
+        self.latencies: Dict[str, deque] = {}
+        self.window = window
+        self._lock = threading.Lock()
+
+    def retried(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def finished(self, kind: str, model: str, latency: float, outcome: str, usage: Any = None) -> None:
+        key = f"{kind}:{model}"
+        with self._lock:
+            self.calls[(key, outcome)] += 1
+            self.latencies.setdefault(key, deque(maxlen=self.window)).append(latency)
+            if usage is not None:
+                self.prompt_tokens[key] += getattr(usage, "prompt_tokens", 0) or 0
+                self.completion_tokens[key] += getattr(usage, "completion_tokens", 0) or 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {}
+            for key, latencies in self.latencies.items():
+                latencies = sorted(latencies)
+                models[key] = {
+                    "completed": self.calls[(key, "completed")],
+                    "failures": self.calls[(key, "failures")],
+                    "timeouts": self.calls[(key, "timeouts")],
+                    "latency_p50_ms": percentile_ms(latencies, 0.50),
+                    "latency_p95_ms": percentile_ms(latencies, 0.95),
+                    "prompt_tokens": self.prompt_tokens[key],
+                    "completion_tokens": self.completion_tokens[key],
+                }
+            return {"retries": self.retries, "models": models}
+
+
+llm_gateway = LLMGateway(settings.LLM_MAX_CONCURRENCY, settings.LLM_MAX_CONCURRENCY_PER_USER, settings.LLM_MAX_RETRIES)
@@ -0,0 +1,167 @@
+# app/services/model_router.py
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.models.applicant import ExtractionModel
+from app.services.document_processor import percentile_ms
+from app.services.llm_gateway import llm_gateway
+
+# USD per million tokens (input, output), for the cost estimates in /metrics
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-1106-preview": (10.00, 30.00),
+}
+
+
+class RoutingMetrics:
+    """Per-route latency, escalations and estimated cost of routed extractions."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.calls = Counter()
+        self.escalations = Counter()
+        self.escalation_reasons = Counter()
+        self.failures = Counter()
+        self.answered_by = Counter()
+        self.cost_usd = Counter()
+        self.latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        route: str,
+        latency: float,
+        model: Optional[str],
+        reasons: List[str],
+        cost: float,
+    ) -> None:
+        with self._lock:
+            self.calls[route] += 1
+            if reasons:
+                self.escalations[route] += 1
+            for reason in reasons:
+                self.escalation_reasons[(route, reason)] += 1
+            if model is None:
+                self.failures[route] += 1
+            else:
+                self.answered_by[(route, model)] += 1
+            self.cost_usd[route] += cost
+            self.latencies.setdefault(route, deque(maxlen=self.window)).append(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {}
+            for route, latencies in self.latencies.items():
+                latencies = sorted(latencies)
+                calls = self.calls[route]
+                routes[route] = {
+                    "calls": calls,
+                    "escalations": self.escalations[route],
+                    "escalation_rate": round(self.escalations[route] / calls, 3) if calls else 0.0,
+                    "escalation_reasons": {
+                        reason: count for (name, reason), count in self.escalation_reasons.items() if name == route
+                    },
+                    "failures": self.failures[route],
+                    "answered_by": {model: count for (name, model), count in self.answered_by.items() if name == route},
+                    "latency_p50_ms": percentile_ms(latencies, 0.50),
+                    "latency_p99_ms": percentile_ms(latencies, 0.99),
+                    "cost_usd": round(self.cost_usd[route], 6),
+                }
+            return {
+                "enabled": settings.LLM_ROUTING_ENABLED,
+                "fast_model": settings.LLM_FAST_MODEL,
+                "fallback_model": settings.LLM_FALLBACK_MODEL,
+                "min_coverage": settings.LLM_ROUTING_MIN_COVERAGE,
+                "routes": routes,
+            }
+
+
+routing_metrics = RoutingMetrics()
+
+
+def route_models(default_model: str) -> List[str]:
+    """Models tried in order: fast then fallback when routing is on, else the route's own model."""
+    if not settings.LLM_ROUTING_ENABLED:
+        return [default_model]
+    return list(dict.fromkeys([settings.LLM_FAST_MODEL, settings.LLM_FALLBACK_MODEL]))
+
+
+def route_signature(default_model: str) -> str:
+    """Identifies which models can produce a route's output, for keys of stored results."""
+    return ">".join(route_models(default_model))
+
+
+def estimate_cost(model: str, usage: Any) -> float:
+    if usage is None or model not in MODEL_PRICES:
+        return 0.0
+    input_price, output_price = MODEL_PRICES[model]
+    return ((usage.prompt_tokens or 0) * input_price + (usage.completion_tokens or 0) * output_price) / 1_000_000
+
+
+async def routed_extraction(
+    route: str,
+    schema: Type[ExtractionModel],
+    default_model: str,
+    messages: List[Dict[str, str]],
+    deadline: Optional[float] = None,
+    use_cache: bool = True,
+) -> ExtractionModel:
+    """
+    Run a JSON extraction on the fast model and validate it against schema.
+    Invalid output, or coverage below LLM_ROUTING_MIN_COVERAGE, escalates to
+    the fallback model. If every model's output is valid but sparse, the one
+    with the best coverage is returned; if none is valid the last error is
+    raised. All models share the deadline.
+    """
+    started = time.perf_counter()
+    deadline = deadline or settings.LLM_DEADLINE_SECONDS
+    reasons: List[str] = []
+    best: Optional[ExtractionModel] = None
+    best_model: Optional[str] = None
+    cost = 0.0
+    error: Optional[Exception] = None
+    models = route_models(default_model)
+
+    for position, model in enumerate(models):
+        remaining = deadline - (time.perf_counter() - started)
+        if remaining <= 0:
+            break
+        reason = None
+        request = {
+            "model": model,
+            "messages": messages,
+            "temperature": 0.0,
+            "response_format": {"type": "json_object"},
+        }
+        try:
+            response = await llm_gateway.chat(deadline=remaining, use_cache=use_cache, **request)
+            if not getattr(response, "from_cache", False):
+                cost += estimate_cost(model, response.usage)
+            result = schema.model_validate_json(response.choices[0].message.content)
+        except ValidationError as e:
+            print(f"{route} output from {model} failed validation: {e.error_count()} errors")
+            llm_gateway.discard(**request)  # Not replayed from the cache on the next attempt
+            error, reason = e, "invalid"
+        except Exception as e:
+            error, reason = e, "error"
+        else:
+            if best is None or result.coverage() > best.coverage():
+                best, best_model = result, model
+            if result.coverage() < settings.LLM_ROUTING_MIN_COVERAGE:
+                reason = "low_coverage"
+
+        if reason is None:
+            break
+        if position < len(models) - 1:
+            reasons.append(reason)
+
+    routing_metrics.record(route, time.perf_counter() - started, best_model, reasons, cost)
+    if best is None:
+        raise error or TimeoutError(f"{route} extraction ran out of time")
+    return best
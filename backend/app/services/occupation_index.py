@@ -0,0 +1,549 @@
+# app/services/occupation_index.py
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from app.core.config import settings, resolve_data_path
+from app.db.supabase_client import get_supabase_client
+from app.services.ann_index import IVFIndex, build_ann_index
+from app.services.lexical_index import LexicalIndex
+from app.services.occupation_search import OccupationPrefixIndex
+
+# Columns kept in memory for every occupation (the embedding lives in the matrix)
+METADATA_FIELDS = ["anzsco_code", "occupation_name", "list", "visa_subclasses", "assessing_authority"]
+
+# PostgREST caps a single select, so the table is read in pages
+FETCH_PAGE_SIZE = 1000
+
+# Bump when the snapshot layout changes so old snapshots are treated as stale
+SNAPSHOT_FORMAT_VERSION = 2
+SNAPSHOT_METADATA_FILE = "occupation_index.json"
+
+# Quantized first-pass scans convert this many rows to float32 at a time
+QUANTIZED_SCAN_BLOCK_ROWS = 4096
+QUANTIZATION_MODES = ("none", "float16", "int8")
+
+
+class OccupationIndex:
+    """
+    Resident occupation embedding index.
+
+    Occupations are loaded once into a contiguous, L2-normalized float32 matrix
+    (one row per occupation) plus a parallel metadata table, so matching a
+    suggestion is a single matrix product instead of a full-table fetch.
+
+    With OCCUPATION_INDEX_QUANTIZATION set to "float16" or "int8" (per-row scale),
+    a compact copy of the matrix is scanned first and only the best
+    OCCUPATION_INDEX_RESCORE_CANDIDATES rows are rescored exactly in float32.
+
+    With OCCUPATION_INDEX_BACKEND set to "ivf", an inverted-file ANN index
+    (see app/services/ann_index.py) replaces the full scan. Several rows may
+    share an ANZSCO code (e.g. one vector per task statement); results always
+    collapse to the best-scoring row per code.
+    """
+
+    def __init__(self):
+        self.embeddings: np.ndarray = np.empty((0, 0), dtype=np.float32)
+        self.occupations: List[Dict[str, Any]] = []
+        self.lexical = LexicalIndex([])
+        self.prefix_index = OccupationPrefixIndex([])
+        self.quantization = "none"
+        self.quantized: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None  # Per-row int8 scales
+        self.backend = "exact"
+        self.ann: Optional[IVFIndex] = None
+        self.code_ids = np.empty(0, dtype=np.int64)  # ANZSCO code id for every row
+        self.max_vectors_per_code = 1
+        self.version: Optional[str] = None
+        self.loaded_at: Optional[str] = None
+        self.source: Optional[str] = None  # "snapshot" or "database"
+        self.source_rows = 0  # Rows in the occupations table when the index was built
+        self.source_updated_at: Optional[str] = None  # Latest occupations.updated_at when the index was built
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.occupations)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.version is not None
+
+    @property
+    def dimension(self) -> int:
+        return self.embeddings.shape[1] if self.embeddings.ndim == 2 else 0
+
+    def reload(self, prefer_snapshot: bool = True) -> str:
+        """
+        Rebuild the index and return the new version stamp.
+
+        The memory-mapped snapshot is used when it exists and is not stale;
+        otherwise the occupations table is read from the database.
+        """
+        with self._lock:
+            if not (prefer_snapshot and self._load_snapshot()):
+                # Stamped before reading, so a change made during the read makes the snapshot stale
+                try:
+                    _, updated_at = fetch_source_stamp()
+                except Exception as e:
+                    print(f"Could not read occupations updated_at, snapshot will not detect edits: {e}")
+                    updated_at = None
+                rows = fetch_occupation_rows()
+                # Extra vectors go after the occupations' own, so each code's first row is its title
+                embeddings, occupations = build_occupation_matrix(rows + fetch_occupation_vector_rows(rows))
+                self._swap(embeddings, occupations, source="database", source_rows=len(rows), source_updated_at=updated_at)
+            print(f"Occupation index loaded from {self.source}: {len(self)} occupations, version {self.version}")
+            return self.version
+
+    def load_matrix(self, embeddings: np.ndarray, occupations: List[Dict[str, Any]], source: str = "memory") -> str:
+        """Build the index from an in-memory embedding matrix (e.g. an export or synthetic set)."""
+        with self._lock:
+            embeddings = np.ascontiguousarray(normalize_rows(np.asarray(embeddings, dtype=np.float32)))
+            self._swap(embeddings, occupations, source=source, source_rows=len(occupations))
+            return self.version
+
+    def ensure_loaded(self) -> None:
+        """Load the index on first use if startup loading did not happen."""
+        if not self.is_loaded:
+            self.reload()
+
+    def top_k(self, query_embeddings: List[List[float]], k: int):
+        """
+        Score a batch of query embeddings and return the k best occupation rows
+        per query as (indices, scores), best first, one row per ANZSCO code.
+        """
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1))
+        rows, scores = self._search(queries, k * self.max_vectors_per_code)
+        return self._aggregate(rows, scores, k)
+
+    def exact_top_k(self, queries: np.ndarray, k: int):
+        """Top k rows per normalized query by a full-precision scan of every row."""
+        similarities = queries @ self.embeddings.T  # (queries, occupations)
+        rows, scores = select_top_k(similarities, k * self.max_vectors_per_code)
+        return self._aggregate(rows, scores, k)
+
+    def recall_check(self, k: int = 5, sample_size: int = 200, noise: float = 0.5, seed: int = 0) -> float:
+        """
+        Recall@k of the active approximate path (quantized or ANN) against the exact path.
+
+        Queries are sampled occupation vectors plus Gaussian noise of roughly the
+        given norm, so they behave like paraphrased titles rather than trivial
+        self-matches. Returns 1.0 when search is already exact.
+        """
+        if (self.quantized is None and self.ann is None) or not len(self):
+            return 1.0
+        rng = np.random.default_rng(seed)
+        rows = rng.choice(len(self), size=min(sample_size, len(self)), replace=False)
+        queries = np.asarray(self.embeddings[rows], dtype=np.float32)
+        queries = normalize_rows(queries + rng.normal(scale=noise / np.sqrt(self.dimension), size=queries.shape).astype(np.float32))
+
+        expected, _ = self.exact_top_k(queries, k)
+        found, _ = self.top_k(queries, k)
+        hits = sum(len(set(e) & set(f)) for e, f in zip(expected.tolist(), found.tolist()))
+        return hits / expected.size
+
+    def _search(self, queries: np.ndarray, k: int):
+        if self.ann is not None:
+            return self.ann.search(lambda rows, query: self._score_rows(rows, query, k), queries, k, settings.OCCUPATION_IVF_PROBES)
+        if self.quantized is None:
+            return select_top_k(queries @ self.embeddings.T, k)
+
+        # First pass over the compact matrix, then exact float32 rescoring of the shortlist
+        shortlist, _ = select_top_k(self._quantized_scores(queries), max(k, settings.OCCUPATION_INDEX_RESCORE_CANDIDATES))
+        exact = np.einsum("qd,qcd->qc", queries, self.embeddings[shortlist])
+        order, scores = select_top_k(exact, k)
+        return np.take_along_axis(shortlist, order, axis=1), scores
+
+    def _score_rows(self, rows: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+        """
+        Scores of some rows (the lists an ANN probe visited) for one query. With
+        quantization the compact matrix scores them all and only the best
+        OCCUPATION_INDEX_RESCORE_CANDIDATES are rescored in float32; the rest
+        score -inf.
+        """
+        shortlist = max(k, settings.OCCUPATION_INDEX_RESCORE_CANDIDATES)
+        if self.quantized is None or shortlist >= len(rows):
+            return np.asarray(self.embeddings[rows], dtype=np.float32) @ query
+        approximate = self.quantized[rows].astype(np.float32) @ query
+        if self.scales is not None:
+            approximate *= self.scales[rows]
+        best = np.argpartition(-approximate, shortlist - 1)[:shortlist]
+        scores = np.full(len(rows), -np.inf, dtype=np.float32)
+        scores[best] = np.asarray(self.embeddings[rows[best]], dtype=np.float32) @ query
+        return scores
+
+    def _aggregate(self, rows: np.ndarray, scores: np.ndarray, k: int):
+        """Collapse rows sharing an ANZSCO code to the best one and keep k per query."""
+        if self.max_vectors_per_code == 1:
+            return rows[:, :k], scores[:, :k]
+        k = min(k, int(self.code_ids.max()) + 1)
+        kept = np.empty((len(rows), k), dtype=np.int64)
+        for i in range(len(rows)):
+            # Rows arrive best first, so the first occurrence of each code is its best score
+            _, first = np.unique(self.code_ids[rows[i]], return_index=True)
+            kept[i] = np.sort(first)[:k]
+        return np.take_along_axis(rows, kept, axis=1), np.take_along_axis(scores, kept, axis=1)
+
+    def _quantized_scores(self, queries: np.ndarray) -> np.ndarray:
+        # Convert one block at a time so the float32 working set stays cache-sized
+        scores = np.empty((len(queries), len(self)), dtype=np.float32)
+        for start in range(0, len(self), QUANTIZED_SCAN_BLOCK_ROWS):
+            block = self.quantized[start:start + QUANTIZED_SCAN_BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def write_snapshot(self, snapshot_dir: Optional[str] = None) -> Path:
+        """
+        Write the loaded index as a versioned .npy matrix plus a JSON metadata file.
+
+        The matrix filename carries the version and the metadata file is replaced
+        last, so workers never pair a new matrix with old metadata.
+        """
+        directory = resolve_snapshot_dir(snapshot_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        matrix_file = f"occupation_embeddings.{self.version}.npy"
+        save_npy(directory / matrix_file, np.ascontiguousarray(self.embeddings, dtype=np.float32))
+
+        quantization = None
+        if self.quantized is not None:
+            quantization = {"mode": self.quantization, "matrix_file": f"occupation_embeddings.{self.version}.{self.quantization}.npy"}
+            save_npy(directory / quantization["matrix_file"], self.quantized)
+            if self.scales is not None:
+                quantization["scales_file"] = f"occupation_embeddings.{self.version}.{self.quantization}-scales.npy"
+                save_npy(directory / quantization["scales_file"], self.scales)
+
+        ann = None
+        if self.ann is not None:
+            ann = {
+                "backend": self.backend,
+                "n_lists": self.ann.n_lists,
+                "centroids_file": f"occupation_embeddings.{self.version}.{self.backend}-centroids.npy",
+                "offsets_file": f"occupation_embeddings.{self.version}.{self.backend}-offsets.npy",
+                "rows_file": f"occupation_embeddings.{self.version}.{self.backend}-rows.npy",
+            }
+            save_npy(directory / ann["centroids_file"], self.ann.centroids)
+            save_npy(directory / ann["offsets_file"], self.ann.list_offsets)
+            save_npy(directory / ann["rows_file"], self.ann.list_rows)
+
+        metadata = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "version": self.version,
+            "created_at": datetime.now().isoformat(),
+            "matrix_file": matrix_file,
+            "count": len(self.occupations),
+            "dimension": self.dimension,
+            "source_rows": self.source_rows,
+            "source_updated_at": self.source_updated_at,
+            "quantization": quantization,
+            "ann": ann,
+            "occupations": self.occupations,
+        }
+        tmp_metadata = directory / f"{SNAPSHOT_METADATA_FILE}.tmp"
+        tmp_metadata.write_text(json.dumps(metadata))
+        os.replace(tmp_metadata, directory / SNAPSHOT_METADATA_FILE)
+
+        # Old matrices stay readable by workers that already mapped them
+        current_files = {matrix_file, *(quantization or {}).values(), *(ann or {}).values()}
+        for old_matrix in directory.glob("occupation_embeddings.*.npy"):
+            if old_matrix.name not in current_files:
+                old_matrix.unlink()
+
+        print(f"Occupation index snapshot {self.version} written to {directory}")
+        return directory / SNAPSHOT_METADATA_FILE
+
+    def _load_snapshot(self) -> bool:
+        """Memory-map the on-disk snapshot; return False if it is missing or stale."""
+        directory = resolve_snapshot_dir()
+        try:
+            metadata = json.loads((directory / SNAPSHOT_METADATA_FILE).read_text())
+        except FileNotFoundError:
+            return False
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error reading occupation index snapshot: {e}")
+            return False
+
+        if metadata.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            print("Occupation index snapshot has an old format, rebuilding from database")
+            return False
+
+        try:
+            embeddings = np.load(directory / metadata["matrix_file"], mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"Error mapping occupation index snapshot: {e}")
+            return False
+
+        if embeddings.shape != (metadata["count"], metadata["dimension"]) or len(metadata["occupations"]) != metadata["count"]:
+            print("Occupation index snapshot is inconsistent, rebuilding from database")
+            return False
+
+        if snapshot_is_stale(metadata):
+            print("Occupation index snapshot is stale, rebuilding from database")
+            return False
+
+        # Reuse the stored quantized matrix when it was built for the configured mode
+        quantized = None
+        stored = metadata.get("quantization")
+        if stored and stored["mode"] == settings.OCCUPATION_INDEX_QUANTIZATION:
+            try:
+                quantized = (
+                    np.load(directory / stored["matrix_file"], mmap_mode="r"),
+                    np.load(directory / stored["scales_file"], mmap_mode="r") if "scales_file" in stored else None,
+                )
+            except (OSError, ValueError) as e:
+                print(f"Error mapping quantized occupation matrix, requantizing: {e}")
+
+        # Likewise reuse the ANN index built offline by the import script
+        ann = None
+        stored = metadata.get("ann")
+        if stored and stored["backend"] == settings.OCCUPATION_INDEX_BACKEND:
+            try:
+                ann = IVFIndex(
+                    np.load(directory / stored["centroids_file"]),
+                    np.load(directory / stored["offsets_file"]),
+                    np.load(directory / stored["rows_file"], mmap_mode="r"),
+                )
+            except (OSError, ValueError) as e:
+                print(f"Error loading occupation ANN index, rebuilding: {e}")
+
+        self._swap(
+            embeddings,
+            metadata["occupations"],
+            source="snapshot",
+            source_rows=metadata["source_rows"],
+            source_updated_at=metadata["source_updated_at"],
+            version=metadata["version"],
+            quantized=quantized,
+            ann=ann,
+        )
+        return True
+
+    def _swap(
+        self,
+        embeddings: np.ndarray,
+        occupations: List[Dict[str, Any]],
+        source: str,
+        source_rows: int,
+        source_updated_at: Optional[str] = None,
+        version: Optional[str] = None,
+        quantized=None,
+        ann: Optional[IVFIndex] = None,
+    ) -> None:
+        # Build everything first, then publish, so readers never see a half-built index
+        version = version or compute_index_version(embeddings, occupations)
+        lexical = LexicalIndex(occupations, threshold=settings.LEXICAL_MATCH_THRESHOLD)
+        prefix_index = OccupationPrefixIndex(occupations)
+        mode = settings.OCCUPATION_INDEX_QUANTIZATION
+        if quantized is None:
+            quantized = quantize_matrix(embeddings, mode)
+        backend = settings.OCCUPATION_INDEX_BACKEND
+        if ann is None:
+            ann = build_ann_index(backend, embeddings, n_lists=settings.OCCUPATION_IVF_LISTS)
+        codes = [occupation["anzsco_code"] for occupation in occupations]
+        _, code_ids, code_counts = np.unique(codes, return_inverse=True, return_counts=True)
+        self.embeddings = embeddings
+        self.quantization = mode if quantized[0] is not None else "none"
+        self.quantized, self.scales = quantized
+        self.backend = backend if ann is not None else "exact"
+        self.ann = ann
+        self.code_ids = code_ids.astype(np.int64)
+        self.max_vectors_per_code = int(code_counts.max()) if len(codes) else 1
+        self.occupations = occupations
+        self.lexical = lexical
+        self.prefix_index = prefix_index
+        self.version = version
+        self.source = source
+        self.source_rows = source_rows
+        self.source_updated_at = source_updated_at
+        self.loaded_at = datetime.now().isoformat()
+
+        if self.quantized is not None or self.ann is not None:
+            recall = f", recall@5 vs exact: {self.recall_check():.3f}" if settings.OCCUPATION_INDEX_RECALL_CHECK else ""
+            print(f"Occupation index using {self.backend} search, {self.quantization} quantization{recall}")
+
+
+def fetch_occupation_rows() -> List[Dict[str, Any]]:
+    """Fetch every occupation (metadata and embedding) from Supabase."""
+    supabase = get_supabase_client()
+    columns = ",".join(METADATA_FIELDS + ["occupation_embedding"])
+
+    rows: List[Dict[str, Any]] = []
+    start = 0
+    while True:
+        response = (
+            supabase.table("occupations")
+            .select(columns)
+            .order("anzsco_code")
+            .range(start, start + FETCH_PAGE_SIZE - 1)
+            .execute()
+        )
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < FETCH_PAGE_SIZE:
+            return rows
+        start += FETCH_PAGE_SIZE
+
+
+def fetch_occupation_vector_rows(occupation_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Further vectors per occupation (specialisations, task statements) from the
+    occupation_vectors table, shaped like occupation rows carrying their
+    occupation's metadata. Empty if the table does not exist.
+    """
+    metadata = {str(row["anzsco_code"]): {field: row.get(field) for field in METADATA_FIELDS} for row in occupation_rows}
+    supabase = get_supabase_client()
+
+    rows: List[Dict[str, Any]] = []
+    start = 0
+    try:
+        while True:
+            response = (
+                supabase.table("occupation_vectors")
+                .select("anzsco_code,embedding")
+                .order("id")
+                .range(start, start + FETCH_PAGE_SIZE - 1)
+                .execute()
+            )
+            page = response.data or []
+            rows.extend(
+                {**metadata[str(row["anzsco_code"])], "occupation_embedding": row["embedding"]}
+                for row in page
+                if str(row["anzsco_code"]) in metadata
+            )
+            if len(page) < FETCH_PAGE_SIZE:
+                return rows
+            start += FETCH_PAGE_SIZE
+    except Exception as e:
+        print(f"Could not read occupation_vectors, using one vector per occupation: {e}")
+        return []
+
+
+def build_occupation_matrix(rows: List[Dict[str, Any]]):
+    """Decode embeddings into a normalized float32 matrix and a compact metadata list."""
+    vectors = []
+    occupations = []
+    for row in rows:
+        embedding = row.get("occupation_embedding")
+        if not embedding:
+            continue
+        if isinstance(embedding, str):  # pgvector / JSON columns come back as strings
+            try:
+                embedding = json.loads(embedding)
+            except json.JSONDecodeError as e:
+                print(f"Error decoding JSON for occupation: {row.get('occupation_name')}, Error: {e}")
+                continue
+        vectors.append(embedding)
+        occupations.append({field: row.get(field) or "" for field in METADATA_FIELDS})
+
+    if not vectors:
+        return np.empty((0, 0), dtype=np.float32), []
+
+    embeddings = np.ascontiguousarray(normalize_rows(np.asarray(vectors, dtype=np.float32)))
+    return embeddings, occupations
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row, leaving all-zero rows untouched."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def select_top_k(similarities: np.ndarray, k: int):
+    """Pick the k highest scores per row with argpartition, sorting only those k."""
+    k = max(1, min(k, similarities.shape[1]))
+    if k < similarities.shape[1]:
+        candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(similarities.shape[1]), (similarities.shape[0], 1))
+    candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+def quantize_matrix(embeddings: np.ndarray, mode: str):
+    """Return (quantized matrix, per-row scales) for a quantization mode; (None, None) for "none"."""
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown occupation index quantization: {mode}")
+    if mode == "none" or not embeddings.size:
+        return None, None
+    if mode == "float16":
+        return np.ascontiguousarray(embeddings, dtype=np.float16), None
+
+    # Symmetric int8 with one scale per row: row ~= quantized * scale
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+    return np.ascontiguousarray(quantized), scales.astype(np.float32)
+
+
+def save_npy(path: Path, array: np.ndarray) -> None:
+    """Write an .npy file atomically."""
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def resolve_snapshot_dir(snapshot_dir: Optional[str] = None) -> Path:
+    """Snapshot directory, defaulting to OCCUPATION_SNAPSHOT_DIR."""
+    return resolve_data_path(snapshot_dir or settings.OCCUPATION_SNAPSHOT_DIR)
+
+
+def fetch_source_stamp():
+    """
+    (row count, latest updated_at) of the occupations table, in one query.
+    updated_at is set on every insert and update (see sql/occupations_updated_at.sql),
+    so a re-import that keeps the row count still changes the stamp.
+    """
+    response = (
+        get_supabase_client().table("occupations")
+        .select("updated_at", count="exact")
+        .order("updated_at", desc=True, nullsfirst=False)
+        .limit(1)
+        .execute()
+    )
+    updated_at = response.data[0]["updated_at"] if response.data else None
+    return response.count, updated_at
+
+
+def snapshot_is_stale(metadata: Dict[str, Any]) -> bool:
+    """
+    A snapshot is stale when the occupations table's row count or latest
+    updated_at differs from when it was built. Only a single query is made; if
+    the database cannot be reached the snapshot is trusted.
+    """
+    try:
+        count, updated_at = fetch_source_stamp()
+    except Exception as e:
+        print(f"Could not verify occupation index snapshot against database: {e}")
+        return False
+    if count is not None and count != metadata["source_rows"]:
+        return True
+    return updated_at != metadata["source_updated_at"]
+
+
+def compute_index_version(embeddings: np.ndarray, occupations: List[Dict[str, Any]]) -> str:
+    """Content hash of the index, so any change to codes or vectors changes the stamp."""
+    digest = hashlib.sha256()
+    for occupation in occupations:
+        digest.update(str(occupation["anzsco_code"]).encode())
+        digest.update(b"\0")
+    digest.update(np.ascontiguousarray(embeddings).tobytes())
+    return digest.hexdigest()[:16]
+
+
+occupation_index = OccupationIndex()
+
+
+def get_occupation_index() -> OccupationIndex:
+    """Return the process-wide occupation index, loading it if needed."""
+    occupation_index.ensure_loaded()
+    return occupation_index
@@ -1,106 +1,88 @@
 # app/services/occupation_matcher.py
-import openai
-import numpy as np
+import asyncio
 from typing import List, Dict, Any
-from app.db.supabase_client import get_supabase_client
 from app.core.config import settings
-import json
-from dotenv import load_dotenv  
-from openai import OpenAI
+from app.services.occupation_index import get_occupation_index
+from app.services.embedding_cache import embedding_cache
+from app.services.llm_gateway import llm_gateway
 
-openai.api_key = settings.OPENAI_API_KEY
-client = OpenAI()
-# Configure OpenAI
-#openai.api_key = settings.OPENAI_API_KEY
+# Caps in-flight embedding requests so bursts of uploads queue here instead of at OpenAI
+embedding_semaphore = asyncio.Semaphore(settings.EMBEDDING_MAX_CONCURRENCY)
 
-async def match_occupations(suggested_occupations: list) -> List[Dict[Any, Any]]:
+async def match_occupations(suggested_occupations: list, top_k: int = 1) -> List[Dict[Any, Any]]:
     """
     Match LLM-suggested occupations to actual ANZSCO occupations using embeddings.
+    Each match is the best ANZSCO occupation for one suggestion, with the top_k
+    ranked candidates for that suggestion attached under "candidates".
+    Suggestions that already are ANZSCO titles resolve lexically with confidence
+    100 and never reach the embeddings API.
     """
-    if not suggested_occupations:
-        return []
+    return (await match_occupation_batches([suggested_occupations], top_k))[0]
 
-    # Generate embeddings for suggested occupations
-    suggested_embeddings = await generate_embeddings(suggested_occupations)
-    
-    #print("Embeddings generated")
-    #print("Embeddings length",len(suggested_embeddings[0]))
-    if suggested_embeddings is None:
-        return []
 
-    # Get Supabase client
-    supabase = get_supabase_client()
-
-    # Fetch all occupations with embeddings from Supabase
-    response = supabase.table("occupations").select("*").execute()
-
-    if not response.data:
-        print("No occupations found in the database")
-        return
-
-    #print(f"Retrieved {len(response.data)} occupations from database")
-    #print(f"Sample occupation: {response.data[0]['occupation_name']}")
-
-    # Process all occupations
-    all_occupations = response.data
-
-    # Ensure embeddings exist for comparison
-    all_occupations = [occ for occ in all_occupations if occ.get('occupation_embedding')]
+async def match_occupation_batches(suggestion_lists: List[list], top_k: int = 1) -> List[List[Dict[Any, Any]]]:
+    """
+    Match several CVs' suggestions at once: one embeddings request for every
+    unresolved title across the lists and one index query for all of them.
+    Returns one match list per input list, as match_occupations would.
+    """
+    results: List[List[Dict[Any, Any]]] = [[] for _ in suggestion_lists]
+    if not any(suggestion_lists):
+        return results
 
-    if not all_occupations:
+    index = get_occupation_index()
+    if not len(index):
         print("No occupations with embeddings found")
-        return
-
-    # Convert stored embeddings (handle string case)
-    for occ in all_occupations:
-        if isinstance(occ["occupation_embedding"], str):  # If stored as a string, convert
-            try:
-                occ["occupation_embedding"] = json.loads(occ["occupation_embedding"])
-            except json.JSONDecodeError as e:
-                print(f"Error decoding JSON for occupation: {occ['occupation_name']}, Error: {e}")
-                continue  # Skip invalid entries
-
-    # Convert embeddings to NumPy array
-    occupation_embeddings = np.array(
-        [occ["occupation_embedding"] for occ in all_occupations], dtype=np.float32
-    )
-    #print(f"Occupation embeddings shape: {occupation_embeddings.shape}")  # Should be (510, 1536)
-
-    # Process each suggested occupation
-    final_matches = []
-    for i, (occupation, embedding) in enumerate(zip(suggested_occupations, suggested_embeddings)):
-        # Convert to numpy array with correct shape
-        embedding_np = np.array(embedding, dtype=np.float32).reshape(1, -1)  # Shape: (1, 1536)
-
-        # Compute cosine similarity correctly
-        similarities = np.dot(occupation_embeddings, embedding_np.T).flatten() / (
-            np.linalg.norm(occupation_embeddings, axis=1) * np.linalg.norm(embedding_np)
-        )
-
-        #print(f"Cosine similarity computed for {occupation}")
-
-        # Attach similarity scores to occupations
-        occupation_with_scores = []
-        for occ, similarity in zip(all_occupations, similarities):
-            occ_copy = occ.copy()  # Create a copy to avoid modifying the original
-            occ_copy["similarity"] = float(similarity)
-            occupation_with_scores.append(occ_copy)
-
-        # Sort matches by similarity (descending) and get the best match
-        top_match = sorted(occupation_with_scores, key=lambda x: x["similarity"], reverse=True)[0]
-        #print(f"Best match found for {occupation}: {top_match['occupation_name']} (Score: {top_match['similarity']*100:.1f}%)")
-
-        # Add the best match to the final list
-        final_matches.append({
-            "anzsco_code": top_match["anzsco_code"],
-            "occupation_name": top_match["occupation_name"],
-            "list": top_match.get("list", ""),
-            "visa_subclasses": top_match.get("visa_subclasses", ""),
-            "assessing_authority": top_match.get("assessing_authority", ""),
-            "confidence_score": round(top_match["similarity"] * 100, 1),
-            "suggested_occupation": occupation
-        })
-
+        return results
+
+    # Resolve exact and near-exact ANZSCO titles before requesting any embeddings
+    suggestions = [(owner, title) for owner, titles in enumerate(suggestion_lists) for title in titles or []]
+    lexical_rows = [index.lexical.lookup(title) for _, title in suggestions]
+    unresolved = list(dict.fromkeys(title for (_, title), row in zip(suggestions, lexical_rows) if row is None))
+
+    vectors = {}
+    if unresolved:
+        suggested_embeddings = await generate_embeddings(unresolved) or []
+        vectors = dict(zip(unresolved, suggested_embeddings))
+
+    # Lexical matches query with their own resident vector, so their neighbours
+    # come out of the same matrix product as the embedded suggestions
+    owners, titles, resolved_rows, queries = [], [], [], []
+    for (owner, title), row in zip(suggestions, lexical_rows):
+        if row is not None:
+            query = index.embeddings[row]
+        else:
+            query = vectors.get(title)
+            if query is None:  # Embedding request failed
+                continue
+        owners.append(owner)
+        titles.append(title)
+        resolved_rows.append(row)
+        queries.append(query)
+
+    if not queries:
+        return results
+
+    # Score every suggestion in one matrix product and keep the top_k rows per suggestion
+    candidate_rows, candidate_scores = index.top_k(queries, top_k)
+
+    final_matches: List[List[Dict[Any, Any]]] = [[] for _ in suggestion_lists]
+    for owner, occupation, resolved_row, rows, scores in zip(owners, titles, resolved_rows, candidate_rows, candidate_scores):
+        resolved_code = index.occupations[resolved_row]["anzsco_code"] if resolved_row is not None else None
+        candidates = [
+            build_match(index.occupations[row], float(score), occupation)
+            for row, score in zip(rows, scores)
+            if index.occupations[row]["anzsco_code"] != resolved_code
+        ]
+        if resolved_row is not None:
+            candidates = [build_match(index.occupations[resolved_row], 1.0, occupation)] + candidates[:top_k - 1]
+        final_matches[owner].append({**candidates[0], "candidates": candidates})
+
+    return [unique_top_matches(matches) for matches in final_matches]
+
+
+def unique_top_matches(final_matches: List[Dict[Any, Any]]) -> List[Dict[Any, Any]]:
+    """One match per occupation name, best confidence first, at most five."""
     # Remove duplicates based on occupation name, keeping the one with the highest confidence score
     unique_matches = {}
     for match in final_matches:
@@ -118,16 +100,36 @@ async def match_occupations(suggested_occupations: list) -> List[Dict[Any, Any]]
     return unique_matches[:5]
 
 
+def build_match(occupation: Dict[str, Any], similarity: float, suggested_occupation: str) -> Dict[str, Any]:
+    """Shape an index row and its similarity into the match format returned to clients."""
+    return {
+        "anzsco_code": occupation["anzsco_code"],
+        "occupation_name": occupation["occupation_name"],
+        "list": occupation.get("list", ""),
+        "visa_subclasses": occupation.get("visa_subclasses", ""),
+        "assessing_authority": occupation.get("assessing_authority", ""),
+        "confidence_score": round(similarity * 100, 1),
+        "suggested_occupation": suggested_occupation
+    }
+
 
 async def generate_embeddings(texts: List[str]) -> List[List[float]]:
-    """Generate embeddings for a list of texts using OpenAI's embedding model."""
+    """
+    Generate embeddings for a list of texts using OpenAI's embedding model.
+    Cached titles are served locally; only misses reach the API, in one batch.
+    """
+    return await embedding_cache.get_embeddings(texts, settings.EMBEDDING_MODEL, request_embeddings)
+
+
+async def request_embeddings(texts: List[str]) -> List[List[float]]:
+    """Call the OpenAI embeddings API for texts not found in the cache."""
     try:
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=texts
-        )
+        async with embedding_semaphore:
+            response = await llm_gateway.embeddings(
+                model=settings.EMBEDDING_MODEL,
+                input=texts
+            )
         return [item.embedding for item in response.data]
     except Exception as e:
         print(f"Error generating embeddings: {e}")
         return None
-
@@ -0,0 +1,69 @@
+# app/services/occupation_search.py
+import re
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+from app.services.lexical_index import normalize_name
+
+# Match ranks: code or whole-name prefix first, then a later word in the name
+RANK_NAME_PREFIX = 0
+RANK_WORD_PREFIX = 1
+
+
+class OccupationPrefixIndex:
+    """
+    Sorted-array prefix index over occupation names and ANZSCO codes.
+
+    Every occupation contributes its code, its normalized name and each word
+    suffix of the name ("software engineer", "engineer"), so a query can start
+    at any word. A lookup is a binary search plus a scan of the matching run.
+    """
+
+    def __init__(self, occupations: List[Dict[str, Any]]):
+        self.occupations = occupations
+        entries = []
+        indexed_codes = set()
+        for row, occupation in enumerate(occupations):
+            if occupation.get("anzsco_code") in indexed_codes:  # Further vectors of an occupation
+                continue
+            indexed_codes.add(occupation.get("anzsco_code"))
+            entries.append((str(occupation.get("anzsco_code") or ""), RANK_NAME_PREFIX, row))
+            words = normalize_name(occupation.get("occupation_name") or "").replace("(", " ").replace(")", " ").split()
+            for position in range(len(words)):
+                rank = RANK_NAME_PREFIX if position == 0 else RANK_WORD_PREFIX
+                entries.append((" ".join(words[position:]), rank, row))
+        entries.sort()
+        self.keys = [key for key, _, _ in entries]
+        self.entries = [(rank, row) for _, rank, row in entries]
+
+        # Filters are precomputed so per-keystroke work is only set membership
+        self.lists = [set(re.findall(r"[a-z0-9]+", (occupation.get("list") or "").lower())) for occupation in occupations]
+        self.subclasses = [set(re.findall(r"\d+", occupation.get("visa_subclasses") or "")) for occupation in occupations]
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        occupation_list: Optional[str] = None,
+        visa_subclass: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Occupations whose code, name or any word of the name starts with the query."""
+        prefix = " ".join(normalize_name(query).replace("(", " ").replace(")", " ").split())
+        if not prefix:
+            return []
+        occupation_list = occupation_list.strip().lower() if occupation_list else None
+
+        best_rank: Dict[int, int] = {}
+        position = bisect_left(self.keys, prefix)
+        while position < len(self.keys) and self.keys[position].startswith(prefix):
+            rank, row = self.entries[position]
+            position += 1
+            if occupation_list and occupation_list not in self.lists[row]:
+                continue
+            if visa_subclass and visa_subclass not in self.subclasses[row]:
+                continue
+            if rank < best_rank.get(row, RANK_WORD_PREFIX + 1):
+                best_rank[row] = rank
+
+        ranked = sorted(best_rank, key=lambda row: (best_rank[row], self.occupations[row]["occupation_name"]))
+        return [self.occupations[row] for row in ranked[:limit]]
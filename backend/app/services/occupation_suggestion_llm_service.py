@@ -1,43 +1,41 @@
 
-import os
 import json
 import re
+import hashlib
 from fastapi import HTTPException
-from openai import AsyncOpenAI, OpenAIError
-from dotenv import load_dotenv  
+from openai import OpenAIError
+from app.services.llm_gateway import llm_gateway
+from app.services.text_normalizer import prepare_cv_text
 
-# ✅ Load .env variables
-load_dotenv()
+OCCUPATION_SUGGESTION_MODEL = "gpt-4o-mini"
 
-# ✅ Get OpenAI API key
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+SYSTEM_PROMPT = "You are an expert Australian migration agent who specializes in analyzing CVs and identifying appropriate ANZSCO occupations for migration visas."
 
-if not OPENAI_API_KEY:
-    raise ValueError("Missing OpenAI API Key! Set OPENAI_API_KEY in your .env file or environment.")
+USER_PROMPT_TEMPLATE = """Analyze the following CV and suggest 3-5 most suitable ANZSCO occupations for Australian skilled migration:
 
-# ✅ Initialize OpenAI client
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+                    {cv_text}
+
+                    For each occupation, provide only the occupation name. Do not include ANZSCO codes or additional information.
+                    Format your response as a JSON array of occupation names only.
+                    """
+
+# Changes whenever the prompt wording changes, so cached suggestions are not reused
+PROMPT_VERSION = hashlib.sha256((SYSTEM_PROMPT + USER_PROMPT_TEMPLATE).encode()).hexdigest()[:12]
 
 async def analyze_cv_with_llm(cv_text: str) -> list:
     """
     Analyze CV text using LLM to suggest suitable occupations for Australian visa.
     """
     print("Analyzing CV with LLM...")
+    cv_text, text_stats = prepare_cv_text(cv_text)
+    print(f"CV text prepared: {text_stats['tokens_before']} -> {text_stats['tokens_after']} tokens")
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
+        response = await llm_gateway.chat(
+            model=OCCUPATION_SUGGESTION_MODEL,
             messages=[
-                {"role": "system", "content": 
-                    "You are an expert Australian migration agent who specializes in analyzing CVs and identifying appropriate ANZSCO occupations for migration visas."},
-                {"role": "user", "content": 
-                    f"""Analyze the following CV and suggest 3-5 most suitable ANZSCO occupations for Australian skilled migration:
-
-                    {cv_text}
-
-                    For each occupation, provide only the occupation name. Do not include ANZSCO codes or additional information.
-                    Format your response as a JSON array of occupation names only.
-                    """}
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": USER_PROMPT_TEMPLATE.format(cv_text=cv_text)}
             ],
             temperature=0.2,
             response_format={"type": "json_object"}  # Updated to correct format
@@ -0,0 +1,243 @@
+# app/services/text_normalizer.py
+import math
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings, resolve_data_path
+from app.services.document_processor import PAGE_BREAK
+
+try:
+    import tiktoken
+except ImportError:  # Optional: token counts fall back to a characters-per-token estimate
+    tiktoken = None
+
+# Rough ratio for English CV text when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Page numbering left behind by PDF extraction, standalone or inside a running header.
+# A bare number is not page numbering: it may be a year from a two-column layout.
+PAGE_LINE = re.compile(r"^[-–\s]*(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s+of\s+\d+)[-–\s]*$|^[-–]\s*\d+\s*[-–]$", re.IGNORECASE)
+PAGE_MARKER = re.compile(r"\bpage\s*\d+(\s*(of|/)\s*\d+)?\b", re.IGNORECASE)
+TRAILING_SEPARATORS = re.compile(r"[\s\-–|•·,]+$")
+
+# Lines at the top and bottom of a page where running headers and footers sit
+MARGIN_LINES = 2
+# A running header or footer repeats at the same margin position on at least
+# this share of pages, and on no fewer than RUNNING_MIN_PAGES
+RUNNING_MIN_PAGE_SHARE = 0.5
+RUNNING_MIN_PAGES = 3
+# Longer lines are body text (sentences, bullets) even when they repeat
+RUNNING_MAX_CHARS = 60
+
+# Lines that carry no information for occupation or applicant extraction
+BOILERPLATE_LINES = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r"^(curriculum vitae|resume|résumé|cv)$",
+        r"^references?( are)? available (up)?on request\.?$",
+        r"^references?:?\s*(available )?(up)?on request\.?$",
+        r"^(private (and|&) )?confidential$",
+        r"^this (cv|resume) (was|is) (created|generated) (with|by|using) .*$",
+    )
+]
+
+# Characters PDF text layers commonly contain that carry no meaning
+INVISIBLE_CHARACTERS = dict.fromkeys(map(ord, "\u00ad\u200b\u200c\u200d\ufeff\x00"), None)
+
+
+class NormalizationMetrics:
+    """Running totals of how much CV text normalization saved."""
+
+    def __init__(self):
+        self.documents = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.truncated = 0
+        self._lock = threading.Lock()
+
+    def record(self, stats: Dict[str, Any]) -> None:
+        with self._lock:
+            self.documents += 1
+            self.tokens_before += stats["tokens_before"]
+            self.tokens_after += stats["tokens_after"]
+            self.truncated += int(stats["truncated"])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": self.documents,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "tokens_saved": self.tokens_before - self.tokens_after,
+                "truncated": self.truncated,
+                "token_budget": settings.LLM_CV_TOKEN_BUDGET,
+                "tokenizer": "tiktoken" if get_encoding() is not None else "estimate",
+            }
+
+
+normalization_metrics = NormalizationMetrics()
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def load_encoding():
+    """
+    Load the LLM_TOKENIZER_ENCODING tokenizer and return it, or None if
+    tiktoken or its encoding file is unavailable. Encoding files are read from
+    LLM_TOKENIZER_CACHE_DIR; tiktoken downloads a missing one, so this blocks
+    and must not run inside a request (the API calls it from a startup thread).
+    """
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None and tiktoken is not None:
+            os.environ.setdefault("TIKTOKEN_CACHE_DIR", str(resolve_data_path(settings.LLM_TOKENIZER_CACHE_DIR)))
+            try:
+                _encoding = tiktoken.get_encoding(settings.LLM_TOKENIZER_ENCODING)
+            except Exception as e:
+                print(f"Could not load tokenizer {settings.LLM_TOKENIZER_ENCODING}, estimating tokens: {e}")
+    return _encoding
+
+
+def get_encoding():
+    """The tokenizer if load_encoding has finished, else None (token counts are estimated)."""
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def normalize_cv_text(text: str) -> str:
+    """
+    Clean extracted CV text: normalize Unicode, strip page numbers and
+    boilerplate, collapse whitespace and blank-line runs. Running headers and
+    footers are kept once: short lines repeated at the same margin position
+    on most pages (see running_lines). Repeats within the body are content
+    and stay. The reading order is unchanged.
+    """
+    text = unicodedata.normalize("NFKC", text).translate(INVISIBLE_CHARACTERS)
+    pages = [clean_page_lines(page) for page in text.split(PAGE_BREAK)]
+
+    margins = [page_margins(page) for page in pages]
+    running = running_lines(pages, margins)
+
+    lines: List[str] = []
+    seen_running = set()
+    for page, positions in zip(pages, margins):
+        for i, line in enumerate(page):
+            key = (positions.get(i), line.casefold())
+            if key in running:
+                if key in seen_running:
+                    continue
+                seen_running.add(key)
+            if not line:
+                if lines and lines[-1]:
+                    lines.append("")
+                continue
+            lines.append(line)
+        if lines and lines[-1]:
+            lines.append("")
+
+    return "\n".join(lines).strip()
+
+
+def clean_page_lines(page: str) -> List[str]:
+    """One page's lines with whitespace collapsed and page numbers and boilerplate removed."""
+    lines: List[str] = []
+    for raw_line in page.splitlines():
+        line = " ".join(raw_line.split())
+        if not line:
+            lines.append(line)
+            continue
+        if PAGE_LINE.match(line):
+            continue
+        if PAGE_MARKER.search(line):
+            line = TRAILING_SEPARATORS.sub("", PAGE_MARKER.sub("", line)).strip() or line
+        if any(pattern.match(line) for pattern in BOILERPLATE_LINES):
+            continue
+        lines.append(line)
+    return lines
+
+
+def page_margins(page: List[str]) -> Dict[int, int]:
+    """
+    Line index -> position of a page's first and last MARGIN_LINES non-empty
+    lines; positions count from 0 at the top and from -1 at the bottom.
+    """
+    content = [i for i, line in enumerate(page) if line]
+    positions = {i: -(offset + 1) for offset, i in enumerate(reversed(content[-MARGIN_LINES:]))}
+    positions.update({i: offset for offset, i in enumerate(content[:MARGIN_LINES])})
+    return positions
+
+
+def running_lines(pages: List[List[str]], margins: List[Dict[int, int]]) -> Set[Tuple[int, str]]:
+    """
+    (position, casefolded line) keys of running headers and footers: lines of
+    at most RUNNING_MAX_CHARS at the same margin position on at least
+    RUNNING_MIN_PAGE_SHARE of the pages and RUNNING_MIN_PAGES, that never
+    appear in the body of a page.
+    """
+    min_pages = max(RUNNING_MIN_PAGES, math.ceil(len(pages) * RUNNING_MIN_PAGE_SHARE))
+    if len(pages) < min_pages:
+        return set()
+
+    margin_pages: Dict[Tuple[int, str], int] = {}
+    body: Set[str] = set()
+    for page, positions in zip(pages, margins):
+        for i, line in enumerate(page):
+            if line and i not in positions:
+                body.add(line.casefold())
+        for key in {(position, page[i].casefold()) for i, position in positions.items()}:
+            margin_pages[key] = margin_pages.get(key, 0) + 1
+    return {
+        key for key, count in margin_pages.items()
+        if count >= min_pages and len(key[1]) <= RUNNING_MAX_CHARS and key[1] not in body
+    }
+
+
+def truncate_to_tokens(text: str, budget: int) -> Tuple[str, bool]:
+    """Cut text to at most `budget` tokens, ending on a line boundary where possible."""
+    encoding = get_encoding()
+    if encoding is None:
+        limit = budget * CHARS_PER_TOKEN
+        if len(text) <= limit:
+            return text, False
+        cut = text[:limit]
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= budget:
+            return text, False
+        cut = encoding.decode(tokens[:budget])
+
+    line_end = cut.rfind("\n")
+    if line_end > len(cut) // 2:
+        cut = cut[:line_end]
+    return cut.rstrip(), True
+
+
+def prepare_cv_text(text: str, token_budget: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Normalize CV text and fit it into the LLM token budget
+    (LLM_CV_TOKEN_BUDGET unless given). Returns the text and before/after counts.
+    """
+    budget = token_budget if token_budget is not None else settings.LLM_CV_TOKEN_BUDGET
+    tokens_before = count_tokens(text)
+    normalized = normalize_cv_text(text)
+    prepared, truncated = truncate_to_tokens(normalized, budget) if budget else (normalized, False)
+
+    stats = {
+        "chars_before": len(text),
+        "chars_after": len(prepared),
+        "tokens_before": tokens_before,
+        "tokens_after": count_tokens(prepared),
+        "truncated": truncated,
+    }
+    stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+    normalization_metrics.record(stats)
+    return prepared, stats
@@ -0,0 +1,245 @@
+# app/services/upload_service.py
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+from typing import List, Optional, Tuple, Union
+
+from fastapi import HTTPException, UploadFile
+
+from app.core.config import settings
+
+PDF_CONTENT_TYPE = "application/pdf"
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+READ_CHUNK_BYTES = 64 * 1024
+# The PDF header may follow a little junk; the trailer may be followed by some
+PDF_HEADER_WINDOW = 1024
+PDF_TRAILER_WINDOW = 2048
+
+
+class SpooledUpload:
+    """
+    An uploaded file copied in fixed-size chunks: kept in memory up to
+    UPLOAD_SPOOL_BYTES, then moved to a named temporary file so extraction
+    workers can open it by path instead of receiving the bytes.
+    """
+
+    def __init__(self, spool_bytes: int):
+        self.spool_bytes = spool_bytes
+        self.size = 0
+        self.content_type: Optional[str] = None
+        self._hash = hashlib.sha256()
+        self._buffer: Optional[io.BytesIO] = io.BytesIO()
+        self._file = None
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        self._hash.update(chunk)
+        if self._buffer is not None and self.size > self.spool_bytes:
+            self._file = tempfile.NamedTemporaryFile(prefix="cv-upload-", delete=False)
+            self._file.write(self._buffer.getvalue())
+            self._buffer = None
+        (self._buffer or self._file).write(chunk)
+
+    @property
+    def sha256(self) -> str:
+        """Hex digest of the bytes written so far."""
+        return self._hash.hexdigest()
+
+    @property
+    def path(self) -> Optional[str]:
+        return self._file.name if self._file is not None else None
+
+    def source(self) -> Union[bytes, str]:
+        """What extraction reads: the bytes while in memory, else the temp file path."""
+        if self._file is not None:
+            self._file.flush()
+            return self._file.name
+        return self._buffer.getvalue()
+
+    def head(self, size: int) -> bytes:
+        return self._read_at(0, size)
+
+    def tail(self, size: int) -> bytes:
+        return self._read_at(max(0, self.size - size), size)
+
+    def _read_at(self, offset: int, size: int) -> bytes:
+        if self._file is None:
+            return self._buffer.getbuffer()[offset:offset + size].tobytes()
+        self._file.flush()
+        with open(self._file.name, "rb") as f:
+            f.seek(offset)
+            return f.read(size)
+
+    def close(self) -> None:
+        """Release the buffer and delete the temp file, if one was created."""
+        self._buffer = None
+        if self._file is not None:
+            self._file.close()
+            try:
+                os.unlink(self._file.name)
+            except OSError:
+                pass
+            self._file = None
+
+
+async def spool_upload(file: UploadFile, max_bytes: Optional[int] = None, sniff: bool = True) -> SpooledUpload:
+    """
+    Copy an upload in chunks, stopping as soon as UPLOAD_MAX_BYTES is exceeded,
+    and identify it from its magic bytes. Raises HTTPException 413 or 400, so
+    oversized or malformed files never reach parsing or the LLM. The request
+    body itself is capped earlier, by UploadLimitMiddleware. A file whose
+    first bytes are neither PDF nor DOCX is rejected before the rest is read.
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=too_large_message(max_bytes))
+
+    upload = SpooledUpload(settings.UPLOAD_SPOOL_BYTES)
+    head_checked = not sniff
+    try:
+        while True:
+            chunk = await file.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            upload.write(chunk)
+            if upload.size > max_bytes:
+                raise HTTPException(status_code=413, detail=too_large_message(max_bytes))
+            if not head_checked and upload.size >= PDF_HEADER_WINDOW:
+                check_magic(upload.head(PDF_HEADER_WINDOW))
+                head_checked = True
+
+        if sniff:
+            upload.content_type = sniff_content_type(upload)
+    except Exception:
+        upload.close()
+        raise
+    return upload
+
+
+def too_large_message(max_bytes: int) -> str:
+    return f"File exceeds the {max_bytes / (1024 * 1024):g} MB upload limit"
+
+
+def check_magic(head: bytes) -> None:
+    """Reject a file whose first bytes hold neither a PDF header nor a zip (DOCX) signature."""
+    if b"%PDF-" not in head and not head.startswith(b"PK\x03\x04"):
+        raise HTTPException(status_code=400, detail="File must be PDF or DOCX")
+
+
+def sniff_content_type(upload: SpooledUpload) -> str:
+    """PDF or DOCX content type from the file's own structure; the client header is ignored."""
+    if upload.size == 0:
+        raise HTTPException(status_code=400, detail="File is empty")
+
+    head = upload.head(PDF_HEADER_WINDOW)
+    if b"%PDF-" in head:
+        if b"%%EOF" not in upload.tail(PDF_TRAILER_WINDOW):
+            raise HTTPException(status_code=400, detail="PDF file is truncated or malformed")
+        return PDF_CONTENT_TYPE
+
+    if head.startswith(b"PK\x03\x04"):
+        source = upload.source()
+        try:
+            with zipfile.ZipFile(source if isinstance(source, str) else io.BytesIO(source)) as archive:
+                names = set(archive.namelist())
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail="DOCX file is corrupted")
+        if "word/document.xml" in names:
+            return DOCX_CONTENT_TYPE
+
+    raise HTTPException(status_code=400, detail="File must be PDF or DOCX")
+
+
+async def spool_batch(files: List[UploadFile]) -> List[Tuple[str, Optional[SpooledUpload], Optional[str]]]:
+    """
+    Spool the files of a batch upload, expanding zip archives of CVs.
+
+    Returns (filename, upload, error) per CV. A file that is too large or not
+    a PDF/DOCX gets an error entry instead of failing the whole batch. Raises
+    HTTPException 400 when the batch holds more than BATCH_MAX_FILES CVs.
+    """
+    entries: List[Tuple[str, Optional[SpooledUpload], Optional[str]]] = []
+    try:
+        for file in files:
+            try:
+                upload = await spool_upload(file, max(settings.UPLOAD_MAX_BYTES, settings.BATCH_MAX_ARCHIVE_BYTES), sniff=False)
+            except HTTPException as e:
+                entries.append((file.filename, None, e.detail))
+                continue
+
+            if is_zip_archive(upload):
+                try:
+                    entries.extend(expand_archive(upload))
+                finally:
+                    upload.close()
+            else:
+                entries.append(check_batch_entry(file.filename, upload))
+
+            if len(entries) > settings.BATCH_MAX_FILES:
+                raise HTTPException(status_code=400, detail=f"A batch can hold at most {settings.BATCH_MAX_FILES} CVs")
+    except Exception:
+        for _, upload, _ in entries:
+            if upload is not None:
+                upload.close()
+        raise
+    return entries
+
+
+def is_zip_archive(upload: SpooledUpload) -> bool:
+    """A zip file that is not itself a DOCX."""
+    if not upload.head(4).startswith(b"PK\x03\x04"):
+        return False
+    source = upload.source()
+    try:
+        with zipfile.ZipFile(source if isinstance(source, str) else io.BytesIO(source)) as archive:
+            return "word/document.xml" not in archive.namelist()
+    except zipfile.BadZipFile:
+        return False
+
+
+def expand_archive(upload: SpooledUpload) -> List[Tuple[str, Optional[SpooledUpload], Optional[str]]]:
+    """Spool each PDF/DOCX member of a zip archive; directories and hidden files are skipped."""
+    entries = []
+    source = upload.source()
+    with zipfile.ZipFile(source if isinstance(source, str) else io.BytesIO(source)) as archive:
+        for member in archive.infolist():
+            name = member.filename
+            basename = os.path.basename(name)
+            if member.is_dir() or not basename or basename.startswith(".") or name.startswith("__MACOSX/"):
+                continue
+            if member.file_size > settings.UPLOAD_MAX_BYTES:
+                entries.append((name, None, too_large_message(settings.UPLOAD_MAX_BYTES)))
+                continue
+
+            spooled = SpooledUpload(settings.UPLOAD_SPOOL_BYTES)
+            with archive.open(member) as stream:
+                # Stop once past the limit even if the member's declared size was forged
+                while spooled.size <= settings.UPLOAD_MAX_BYTES:
+                    chunk = stream.read(READ_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    spooled.write(chunk)
+            if spooled.size > settings.UPLOAD_MAX_BYTES:
+                spooled.close()
+                entries.append((name, None, too_large_message(settings.UPLOAD_MAX_BYTES)))
+                continue
+            entries.append(check_batch_entry(name, spooled))
+
+            if len(entries) > settings.BATCH_MAX_FILES:
+                break
+    return entries
+
+
+def check_batch_entry(filename: str, upload: SpooledUpload) -> Tuple[str, Optional[SpooledUpload], Optional[str]]:
+    """Apply the single-upload size limit and type sniffing to one CV of a batch."""
+    try:
+        if upload.size > settings.UPLOAD_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=too_large_message(settings.UPLOAD_MAX_BYTES))
+        upload.content_type = sniff_content_type(upload)
+    except HTTPException as e:
+        upload.close()
+        return filename, None, e.detail
+    return filename, upload, None
@@ -1,25 +1,84 @@
+from app.db.local_cache import LRUCache
 from app.db.supabase_client import get_supabase_client
 from app.services.occupation_suggestion_llm_service import analyze_cv_with_llm
 from app.services.visa_subclasses.visa_189_service import process_189_assessment
+from app.core.config import settings
+from app.services.cv_profile_service import CV_PROFILE_MODEL, PROMPT_VERSION as CV_PROFILE_PROMPT_VERSION, extract_cv_profile, profile_applicant_data
+from app.models.applicant import ApplicantDataExtraction
+from app.services.model_router import route_signature, routed_extraction
+from app.services.text_normalizer import prepare_cv_text
 
 # app/services/visa_assessment_service.py
+import hashlib
 import json
 from uuid import uuid4
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 import openai
-from openai import OpenAI
-from dotenv import load_dotenv  
-import os
 
-load_dotenv()
+APPLICANT_DATA_MODEL = "gpt-4o-mini"
 
+APPLICANT_DATA_SYSTEM_PROMPT = "You are a helpful assistant that extracts structured data from text and returns it as JSON."
 
-# Get OpenAI API key
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+APPLICANT_DATA_PROMPT_TEMPLATE = """
+    Based on the following CV, extract information relevant for an Australian skilled visa application.
+    Extract the following details if available:
+    
+    1. Full name
+    2. Email address
+    3. Date of birth or age
+    4. Education qualifications (level, institution, field, country, dates)
+    5. Work experience (job titles, companies, dates, locations)
+    6. English language proficiency level and test scores if mentioned
+    
+    Format your response as structured JSON with these fields (leave empty if not found):
+    {{
+      "full_name": "",
+      "email": "",
+      "date_of_birth": "YYYY-MM-DD", // or null
+      "age": null, // numeric age if date not available
+      "education": [
+        {{
+          "level": "", // phd, masters, bachelors, diploma, etc.
+          "field": "",
+          "institution": "",
+          "country": "",
+          "start_date": "YYYY-MM", // or null
+          "end_date": "YYYY-MM" // or null
+        }}
+      ],
+      "experience": [
+        {{
+          "title": "",
+          "company": "",
+          "country": "",
+          "start_date": "YYYY-MM", // or null
+          "end_date": "YYYY-MM", // or "present" if current
+          "duration_years": null // numeric duration if dates not clear
+        }}
+      ],
+      "english": {{
+        "level": "", // superior, proficient, competent, or null
+        "test": "", // IELTS, PTE, etc.
+        "scores": {{
+          "overall": null,
+          "reading": null,
+          "writing": null,
+          "speaking": null,
+          "listening": null
+        }}
+      }}
+    }}
+
+    CV Content:
+    {cv_text}
+    """
+
+# Changes whenever the prompt wording changes, so stored extractions are not reused
+APPLICANT_DATA_PROMPT_VERSION = hashlib.sha256((APPLICANT_DATA_SYSTEM_PROMPT + APPLICANT_DATA_PROMPT_TEMPLATE).encode()).hexdigest()[:12]
 
-#  Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Recently used extractions, keyed by document id, prompt version and model
+applicant_data_cache = LRUCache(256)
 
 
 # In /services/visa_assessment_service.py
@@ -131,89 +190,87 @@ async def update_visa_assessment(assessment_id: str, update_data: Dict[str, Any]
 
 
 
-async def extract_applicant_data_from_cv(cv_text: str) -> Dict[str,Any]:
-    """Extract applicant data from CV using OpenAI API and return JSON response."""
-    
-    # Updated prompt with clear instructions for JSON output
-    prompt = f"""
-    Based on the following CV, extract information relevant for an Australian skilled visa application.
-    Extract the following details if available:
-    
-    1. Full name
-    2. Email address
-    3. Date of birth or age
-    4. Education qualifications (level, institution, field, country, dates)
-    5. Work experience (job titles, companies, dates, locations)
-    6. English language proficiency level and test scores if mentioned
-    
-    Format your response as structured JSON with these fields (leave empty if not found):
-    {{
-      "full_name": "",
-      "email": "",
-      "date_of_birth": "YYYY-MM-DD", // or null
-      "age": null, // numeric age if date not available
-      "education": [
-        {{
-          "level": "", // phd, masters, bachelors, diploma, etc.
-          "field": "",
-          "institution": "",
-          "country": "",
-          "start_date": "YYYY-MM", // or null
-          "end_date": "YYYY-MM" // or null
-        }}
-      ],
-      "experience": [
-        {{
-          "title": "",
-          "company": "",
-          "country": "",
-          "start_date": "YYYY-MM", // or null
-          "end_date": "YYYY-MM", // or "present" if current
-          "duration_years": null // numeric duration if dates not clear
-        }}
-      ],
-      "english": {{
-        "level": "", // superior, proficient, competent, or null
-        "test": "", // IELTS, PTE, etc.
-        "scores": {{
-          "overall": null,
-          "reading": null,
-          "writing": null,
-          "speaking": null,
-          "listening": null
-        }}
-      }}
-    }}
+async def get_document_applicant_data(document: Dict[str, Any], refresh: bool = False) -> Dict[str, Any]:
+    """
+    Structured applicant data for a document, extracted once per document,
+    prompt version and model and stored in the document_extractions table.
+    With refresh the CV is extracted again and the stored copy replaced.
+    """
+    prompt_version, model = applicant_data_extractor()
+    key = f"{document['id']}:{prompt_version}:{model}"
+    if not refresh:
+        stored = applicant_data_cache.get(key)
+        if stored is not None:
+            return stored
+        try:
+            result = get_supabase_client().table("document_extractions").select("applicant_data").eq("document_id", document["id"]).eq("prompt_version", prompt_version).eq("model", model).limit(1).execute()
+            if result.data:
+                applicant_data_cache.set(key, result.data[0]["applicant_data"])
+                return result.data[0]["applicant_data"]
+        except Exception as e:
+            print(f"Error reading stored applicant data for document {document['id']}: {e}")
 
-    CV Content:
-    {cv_text}
+    applicant_data = await extract_applicant_data_from_cv(document["extracted_text"], use_cache=not refresh)
+    if "error" in applicant_data:
+        return applicant_data
+
+    try:
+        get_supabase_client().table("document_extractions").upsert({
+            "document_id": document["id"],
+            "prompt_version": prompt_version,
+            "model": model,
+            "applicant_data": applicant_data,
+            "created_at": datetime.now().isoformat()
+        }, on_conflict="document_id,prompt_version,model").execute()
+    except Exception as e:
+        print(f"Error storing applicant data for document {document['id']}: {e}")
+    applicant_data_cache.set(key, applicant_data)
+    return applicant_data
+
+
+def applicant_data_extractor() -> Tuple[str, str]:
+    """Prompt version and model that produce applicant data in the current LLM_EXTRACTION_MODE."""
+    if settings.LLM_EXTRACTION_MODE == "combined":
+        return f"combined-{CV_PROFILE_PROMPT_VERSION}", route_signature(CV_PROFILE_MODEL)
+    return APPLICANT_DATA_PROMPT_VERSION, route_signature(APPLICANT_DATA_MODEL)
+
+
+async def extract_applicant_data_from_cv(cv_text: str, use_cache: bool = True) -> Dict[str,Any]:
     """
+    Extract applicant data from CV using OpenAI API and return it parsed from the JSON response.
+    Identical CV text is answered from the LLM response cache unless use_cache is False.
+    """
+    if settings.LLM_EXTRACTION_MODE == "combined":
+        try:
+            # Usually a cache hit: the upload made the same profile call for its suggestions
+            return profile_applicant_data(await extract_cv_profile(cv_text, use_cache=use_cache))
+        except Exception as e:
+            return {"error": f"Profile extraction error: {str(e)}"}
+
+    cv_text, _ = prepare_cv_text(cv_text)
 
     try:
-        # Updated OpenAI API call using the client
-        response = client.chat.completions.create(
-            model="gpt-4o-mini", 
+        # Fast model first, escalating if the output is invalid or sparse
+        result = await routed_extraction(
+            "applicant_data",
+            ApplicantDataExtraction,
+            APPLICANT_DATA_MODEL,
             messages=[
                 {
                     "role": "system",
-                    "content": "You are a helpful assistant that extracts structured data from text and returns it as JSON."
+                    "content": APPLICANT_DATA_SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
-                    "content": prompt
+                    "content": APPLICANT_DATA_PROMPT_TEMPLATE.format(cv_text=cv_text)
                 }
             ],
-            temperature=0.0,  # Low temperature for more deterministic output
-            response_format={"type": "json_object"}  # Ensures JSON output (available in newer API versions)
+            use_cache=use_cache,
         )
-
-        # OpenAI already returns a dictionary
-        applicant_data = response.choices[0].message.content
-        #print(applicant_data)
-        return applicant_data  # Returning as Dict[str, Any]
+        return result.model_dump()
 
     except openai.APIError as e:
         return {"error": f"OpenAI API error: {str(e)}"}
 
     except Exception as e:
-        return {"error": f"Unexpected error: {str(e)}"}
\ No newline at end of file
+        return {"error": f"Unexpected error: {str(e)}"}
@@ -87,7 +87,8 @@ async def process_189_assessment(assessment_data: Dict[str, Any], applicant_data
     # If we have applicant data, fill in the details
     print("APPLICANT DATA FROM 189 VISA ASSESSMENT SERVICE:",applicant_data)
     if applicant_data:
-        applicant_data = json.loads(applicant_data)
+        if isinstance(applicant_data, str):
+            applicant_data = json.loads(applicant_data)
 
         # Basic details
         #assessment_data["applicant_name"] = applicant_data["full_name"]
@@ -0,0 +1,138 @@
+# scripts/benchmark_docx_extraction.py
+"""
+Benchmark DOCX text extraction: python-docx paragraphs (the previous path)
+against the streaming document.xml extractor.
+
+Synthetic resumes are generated with python-docx at several sizes. Each one
+has a header, employment history in tables and plain paragraphs. Real files
+can be passed with --files. For every document and extractor it reports
+latency percentiles, peak allocations, extracted characters and, for
+synthetic files, the share of table and header text that was recovered.
+
+    python scripts/benchmark_docx_extraction.py --sizes 50,500,5000 --output docx.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from docx import Document
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.docx_extractor import extract_docx_text
+
+
+def python_docx_text(file_content: bytes) -> str:
+    """The previous extractor: body paragraphs only."""
+    doc = Document(io.BytesIO(file_content))
+    return "\n".join([paragraph.text for paragraph in doc.paragraphs])
+
+
+EXTRACTORS: Dict[str, Callable[[bytes], str]] = {
+    "python-docx": python_docx_text,
+    "streaming": extract_docx_text,
+}
+
+
+def synthetic_resume(roles: int) -> (bytes, List[str]):
+    """A resume with `roles` employment entries; returns the file and marker strings kept outside paragraphs."""
+    doc = Document()
+    markers = ["Header marker applicant@example.com"]
+    doc.sections[0].header.paragraphs[0].text = markers[0]
+    doc.add_heading("Jane Doe - Curriculum Vitae", level=1)
+    doc.add_paragraph("Experienced engineer with a background in distributed systems. " * 3)
+
+    table = doc.add_table(rows=1, cols=3)
+    table.rows[0].cells[0].text, table.rows[0].cells[1].text, table.rows[0].cells[2].text = "Years", "Employer", "Role"
+    for i in range(roles):
+        row = table.add_row().cells
+        row[0].text = f"{2000 + i % 24}-{2001 + i % 24}"
+        row[1].text = f"Table employer {i}"
+        row[2].text = "Software Engineer"
+        markers.append(f"Table employer {i}")
+        doc.add_paragraph(f"Role {i}: delivered projects, mentored staff and maintained services. " * 2)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue(), markers
+
+
+def percentile(values: List[float], q: float) -> float:
+    return round(float(np.percentile(values, q)) * 1000, 3)
+
+
+def run_extractor(name: str, file_content: bytes, markers: Optional[List[str]], repeat: int) -> Dict[str, Any]:
+    extract = EXTRACTORS[name]
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = extract(file_content)
+        latencies.append(time.perf_counter() - start)
+
+    # Allocation peaks are measured separately; tracing distorts latency
+    tracemalloc.start()
+    extract(file_content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "extractor": name,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "peak_alloc_kb": round(peak / 1024, 1),
+        "chars": len(text),
+        "marker_recall": round(sum(m in text for m in markers) / len(markers), 4) if markers else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DOCX text extractors.")
+    parser.add_argument("--sizes", default="50,500,5000", help="Comma-separated employment entries per synthetic resume")
+    parser.add_argument("--files", nargs="*", default=[], help="Real DOCX files to benchmark as well")
+    parser.add_argument("--extractors", default=",".join(EXTRACTORS), help="Comma-separated extractors to run")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per document and extractor")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    documents = []
+    for size in args.sizes.split(","):
+        if size:
+            file_content, markers = synthetic_resume(int(size))
+            documents.append((f"synthetic-{size}", file_content, markers))
+    for path in args.files:
+        with open(path, "rb") as f:
+            documents.append((os.path.basename(path), f.read(), None))
+
+    results = []
+    for label, file_content, markers in documents:
+        for name in args.extractors.split(","):
+            print(f"Benchmarking {name} on {label}", file=sys.stderr)
+            result = run_extractor(name, file_content, markers, args.repeat)
+            result.update({"document": label, "file_kb": round(len(file_content) / 1024, 1)})
+            results.append(result)
+
+    report = {
+        "benchmark": "docx_extraction",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "machine": platform.machine()},
+        "parameters": {"repeat": args.repeat},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# scripts/benchmark_occupation_matching.py
+"""
+Benchmark the occupation matching path without OpenAI or Supabase.
+
+Occupation embeddings come from a synthetic clustered set (or an exported
+index snapshot) and the embedding call is faked, so only local matching is
+measured. For every index size and variant it reports per-call latency
+percentiles, peak allocations, top-1/top-5 agreement with an exact scan and
+the index's own recall@5 check.
+
+Results are written as JSON (stdout by default) so runs can be diffed in review:
+
+    python scripts/benchmark_occupation_matching.py --sizes 500,5000 --output bench.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app reads these at import time; the benchmark never contacts either service
+for name, value in {
+    "SUPABASE_URL": "http://localhost:54321",
+    "SUPABASE_KEY": "benchmark",
+    "OPENAI_API_KEY": "benchmark",
+    "SECRET_KEY": "benchmark",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "GOOGLE_CLIENT_ID": "benchmark",
+}.items():
+    os.environ.setdefault(name, value)
+
+from app.core.config import settings
+from app.services import occupation_index as index_module
+from app.services import occupation_matcher
+from app.services.occupation_index import OccupationIndex, normalize_rows
+
+# Variant name -> settings applied before the index is built
+VARIANTS = {
+    "exact": None,  # Per-suggestion scan with full sort, as matching worked before the resident index
+    "batched": {"OCCUPATION_INDEX_BACKEND": "exact", "OCCUPATION_INDEX_QUANTIZATION": "none"},
+    "quantized-float16": {"OCCUPATION_INDEX_BACKEND": "exact", "OCCUPATION_INDEX_QUANTIZATION": "float16"},
+    "quantized-int8": {"OCCUPATION_INDEX_BACKEND": "exact", "OCCUPATION_INDEX_QUANTIZATION": "int8"},
+    "ann-ivf": {"OCCUPATION_INDEX_BACKEND": "ivf", "OCCUPATION_INDEX_QUANTIZATION": "none"},
+}
+
+
+def synthetic_occupations(n: int, dim: int, seed: int):
+    """Clustered unit vectors, roughly how related ANZSCO titles sit in embedding space."""
+    rng = np.random.default_rng(seed)
+    n_clusters = max(1, n // 20)
+    centers = rng.standard_normal((n_clusters, dim), dtype=np.float32)
+    embeddings = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 4096):
+        stop = min(n, start + 4096)
+        embeddings[start:stop] = centers[rng.integers(0, n_clusters, stop - start)]
+        embeddings[start:stop] += 0.6 * rng.standard_normal((stop - start, dim), dtype=np.float32)
+    words = synthetic_words(rng, 400)
+    occupations = [
+        {
+            "anzsco_code": f"{100000 + i}",
+            "occupation_name": " ".join(rng.choice(words, size=3)).title(),
+            "list": "MLTSSL",
+            "visa_subclasses": "189, 190",
+            "assessing_authority": "Benchmark",
+        }
+        for i in range(n)
+    ]
+    return normalize_rows(embeddings), occupations
+
+
+def synthetic_words(rng, count: int) -> List[str]:
+    """Pronounceable-looking tokens so lexical lookups see realistic trigram postings."""
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    return ["".join(rng.choice(letters, size=rng.integers(5, 10))) for _ in range(count)]
+
+
+def exported_occupations(snapshot_dir: str):
+    """Embeddings and metadata from a snapshot written by import_occupations.py."""
+    metadata = json.loads(open(os.path.join(snapshot_dir, index_module.SNAPSHOT_METADATA_FILE)).read())
+    embeddings = np.load(os.path.join(snapshot_dir, metadata["matrix_file"]))
+    return embeddings, metadata["occupations"]
+
+
+def make_queries(embeddings: np.ndarray, count: int, suggestions: int, seed: int):
+    """Batches of suggestion vectors: occupation vectors plus paraphrase-sized noise."""
+    rng = np.random.default_rng(seed + 1)
+    rows = rng.integers(0, len(embeddings), size=(count, suggestions))
+    noise = rng.standard_normal((count, suggestions, embeddings.shape[1]), dtype=np.float32)
+    vectors = embeddings[rows] + 0.5 * noise / np.sqrt(embeddings.shape[1])
+    return [
+        {f"suggested title {b}-{s}": vectors[b, s] for s in range(suggestions)}
+        for b in range(count)
+    ]
+
+
+def legacy_match(titles: List[str], vectors, embeddings: np.ndarray, occupations: List[Dict[str, Any]]):
+    """The pre-index algorithm: norms recomputed, every row copied and fully sorted per suggestion."""
+    matches = []
+    for title in titles:
+        query = np.asarray(vectors[title], dtype=np.float32)
+        similarities = embeddings @ query / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query))
+        scored = []
+        for occupation, similarity in zip(occupations, similarities):
+            occupation_copy = occupation.copy()
+            occupation_copy["similarity"] = float(similarity)
+            scored.append(occupation_copy)
+        ranked = sorted(scored, key=lambda x: x["similarity"], reverse=True)
+        matches.append({
+            "suggested_occupation": title,
+            "anzsco_code": ranked[0]["anzsco_code"],
+            "candidates": [{"anzsco_code": occupation["anzsco_code"]} for occupation in ranked[:5]],
+        })
+    return matches
+
+
+def percentile(values: List[float], q: float) -> float:
+    return round(float(np.percentile(values, q)) * 1000, 3)
+
+
+async def run_variant(variant, embeddings, occupations, batches, truth, alloc_samples):
+    settings_overrides = VARIANTS[variant]
+    if settings_overrides is not None:
+        for name, value in settings_overrides.items():
+            setattr(settings, name, value)
+        build_start = time.perf_counter()
+        index = OccupationIndex()
+        index.load_matrix(embeddings, occupations, source="benchmark")
+        build_seconds = time.perf_counter() - build_start
+        index_module.occupation_index = index  # match_occupations reads the module singleton
+        recall = round(index.recall_check(), 4)
+
+        async def match(batch):
+            return await occupation_matcher.match_occupations(list(batch), top_k=5)
+    else:
+        build_seconds = 0.0
+        recall = None
+
+        async def match(batch):
+            return legacy_match(list(batch), batch, embeddings, occupations)
+
+    # Fake embedding call: suggestion vectors are looked up, never requested
+    current = {}
+
+    async def fake_embeddings(texts):
+        return [current[text] for text in texts]
+
+    occupation_matcher.generate_embeddings = fake_embeddings
+
+    latencies = []
+    top1 = top5 = compared = 0
+    for batch in batches:
+        current = batch
+        start = time.perf_counter()
+        matches = await match(batch)
+        latencies.append(time.perf_counter() - start)
+        for found in matches:
+            expected = truth[found["suggested_occupation"]]
+            top1 += found["anzsco_code"] == expected[0]
+            top5 += len({c["anzsco_code"] for c in found["candidates"]} & set(expected)) / len(expected)
+            compared += 1
+
+    # Allocation peaks are measured separately; tracing distorts latency
+    peaks = []
+    for batch in batches[:alloc_samples]:
+        current = batch
+        tracemalloc.start()
+        await match(batch)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "variant": variant,
+        "build_seconds": round(build_seconds, 3),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "peak_alloc_kb": round(max(peaks) / 1024, 1) if peaks else None,
+        "top1_agreement": round(top1 / compared, 4) if compared else None,
+        "top5_agreement": round(top5 / compared, 4) if compared else None,
+        "recall_at_5": recall,  # OccupationIndex.recall_check: sampled noisy occupation vectors
+    }
+
+
+def exact_truth(embeddings: np.ndarray, occupations, batches) -> Dict[str, List[str]]:
+    """Top-5 ANZSCO codes per suggestion from a plain full-precision scan."""
+    truth = {}
+    for batch in batches:
+        titles = list(batch)
+        queries = normalize_rows(np.asarray([batch[t] for t in titles], dtype=np.float32))
+        similarities = queries @ embeddings.T
+        for title, row in zip(titles, similarities):
+            truth[title] = [occupations[i]["anzsco_code"] for i in np.argsort(-row)[:5]]
+    return truth
+
+
+async def run(args) -> Dict[str, Any]:
+    if args.snapshot:
+        sources = [("export", *exported_occupations(args.snapshot))]
+    else:
+        sources = [
+            ("synthetic", *synthetic_occupations(int(n), args.dim, args.seed))
+            for n in args.sizes.split(",")
+        ]
+
+    results = []
+    for source, embeddings, occupations in sources:
+        batches = make_queries(embeddings, args.queries, args.suggestions, args.seed)
+        truth = exact_truth(embeddings, occupations, batches)
+        for variant in args.variants.split(","):
+            print(f"Benchmarking {variant} on {len(occupations)} {source} occupations", file=sys.stderr)
+            result = await run_variant(variant, embeddings, occupations, batches, truth, args.alloc_samples)
+            result.update({"source": source, "occupations": len(occupations), "dimension": int(embeddings.shape[1])})
+            results.append(result)
+
+    return {
+        "benchmark": "occupation_matching",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine()},
+        "parameters": {
+            "queries": args.queries,
+            "suggestions_per_query": args.suggestions,
+            "ivf_probes": settings.OCCUPATION_IVF_PROBES,
+            "rescore_candidates": settings.OCCUPATION_INDEX_RESCORE_CANDIDATES,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark occupation matching variants.")
+    parser.add_argument("--sizes", default="500,5000,50000", help="Comma-separated synthetic index sizes")
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding dimension for synthetic sets")
+    parser.add_argument("--snapshot", help="Benchmark an exported index snapshot directory instead")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="Comma-separated variants to run")
+    parser.add_argument("--queries", type=int, default=200, help="Match calls per variant")
+    parser.add_argument("--suggestions", type=int, default=5, help="Suggested titles per match call")
+    parser.add_argument("--alloc-samples", type=int, default=10, help="Calls traced for peak allocations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    # Index loading logs go to stderr so stdout stays machine-readable
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(run(args))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# scripts/fetch_tokenizer.py
+import os
+import sys
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.text_normalizer import load_encoding
+
+
+def fetch_tokenizer() -> None:
+    """
+    Download the LLM_TOKENIZER_ENCODING file into LLM_TOKENIZER_CACHE_DIR, so
+    the API counts tokens exactly without network access. Run at build or
+    deploy time.
+    """
+    if load_encoding() is None:
+        print(f"Could not fetch tokenizer {settings.LLM_TOKENIZER_ENCODING}; check tiktoken is installed and the network is reachable")
+        sys.exit(1)
+    print(f"Tokenizer {settings.LLM_TOKENIZER_ENCODING} cached in {os.environ['TIKTOKEN_CACHE_DIR']}")
+
+
+if __name__ == "__main__":
+    fetch_tokenizer()
@@ -5,15 +5,26 @@ import sys
 import logging
 import json
 import time
+from datetime import datetime, timezone
 
 # Add the project root to the path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.db.supabase_client import get_supabase_client
+from app.services.occupation_index import occupation_index
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Convert embeddings from string to array format if needed
+def process_embedding(embedding):
+    if isinstance(embedding, str):
+        if embedding.startswith('[') and embedding.endswith(']'):
+            return [float(x.strip()) for x in embedding.strip('[]').split(',')]
+        else:
+            return [float(x) for x in embedding.split()]
+    return embedding
+
 def import_occupations(csv_path: str) -> None:
     """
     Import occupations from a CSV file into Supabase.
@@ -29,15 +40,6 @@ def import_occupations(csv_path: str) -> None:
         # Process each row and prepare for import
         logger.info(f"Processing {len(df)} occupations")
         
-        # Convert embeddings from string to array format if needed
-        def process_embedding(embedding):
-            if isinstance(embedding, str):
-                if embedding.startswith('[') and embedding.endswith(']'):
-                    return [float(x.strip()) for x in embedding.strip('[]').split(',')]
-                else:
-                    return [float(x) for x in embedding.split()]
-            return embedding
-        
         # Apply the conversion
         if 'occupation_embedding' in df.columns:
             df['occupation_embedding'] = df['occupation_embedding'].apply(process_embedding)
@@ -51,18 +53,13 @@ def import_occupations(csv_path: str) -> None:
             
             # Convert DataFrame to list of dictionaries
             records = batch_df.to_dict('records')
-            
-            # Insert records using Supabase
+            # Stamps the rows so index snapshots built before this import are seen as stale
+            imported_at = datetime.now(timezone.utc).isoformat()
             for record in records:
-                # Check if record already exists
-                response = supabase.table('occupations').select('anzsco_code').eq('anzsco_code', record['anzsco_code']).execute()
-                
-                if len(response.data) > 0:
-                    # Update existing record
-                    supabase.table('occupations').update(record).eq('anzsco_code', record['anzsco_code']).execute()
-                else:
-                    # Insert new record
-                    supabase.table('occupations').insert(record).execute()
+                record['updated_at'] = imported_at
+            
+            # Insert new records and update existing ones in one request per batch
+            supabase.table('occupations').upsert(records, on_conflict='anzsco_code').execute()
             
             logger.info(f"Imported {min(i+batch_size, total_rows)} of {total_rows} occupations")
             
@@ -75,12 +72,73 @@ def import_occupations(csv_path: str) -> None:
         logger.error(f"Error importing occupations: {e}")
         raise
 
+    write_index_snapshot()
+
+def import_occupation_vectors(csv_path: str) -> None:
+    """
+    Import further vectors per occupation (specialisations, task statements)
+    from a CSV with anzsco_code, kind, text and embedding columns into the
+    occupation_vectors table, then rebuild the index snapshot.
+    """
+    supabase = get_supabase_client()
+
+    try:
+        logger.info(f"Reading occupation vectors from {csv_path}")
+        df = pd.read_csv(csv_path, usecols=['anzsco_code', 'kind', 'text', 'embedding'], dtype={'anzsco_code': str})
+        df['embedding'] = df['embedding'].apply(process_embedding)
+
+        batch_size = 200
+        total_rows = len(df)
+        for i in range(0, total_rows, batch_size):
+            records = df.iloc[i:min(i+batch_size, total_rows)].to_dict('records')
+            supabase.table('occupation_vectors').upsert(records, on_conflict='anzsco_code,kind,text').execute()
+            logger.info(f"Imported {min(i+batch_size, total_rows)} of {total_rows} occupation vectors")
+            time.sleep(1)
+
+        logger.info(f"Successfully imported {total_rows} occupation vectors")
+
+    except Exception as e:
+        logger.error(f"Error importing occupation vectors: {e}")
+        raise
+
+    write_index_snapshot()
+
+def write_index_snapshot() -> None:
+    """
+    Rebuild the occupation index from the database and write the memory-mapped
+    snapshot that API workers load at startup.
+    """
+    version = occupation_index.reload(prefer_snapshot=False)
+    if not len(occupation_index):
+        logger.error("No occupations with embeddings found, snapshot not written")
+        return
+    path = occupation_index.write_snapshot()
+    logger.info(f"Wrote occupation index snapshot {version} ({len(occupation_index)} occupations) to {path}")
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        logger.error("Usage: python import_occupations.py <path_to_csv>")
+    usage = "Usage: python import_occupations.py <path_to_csv> | --vectors <path_to_csv> | --snapshot-only"
+    if len(sys.argv) not in (2, 3):
+        logger.error(usage)
         sys.exit(1)
-        
+
+    if sys.argv[1] == "--snapshot-only":
+        write_index_snapshot()
+        sys.exit(0)
+
+    if sys.argv[1] == "--vectors":
+        if len(sys.argv) != 3:
+            logger.error(usage)
+            sys.exit(1)
+        if not os.path.exists(sys.argv[2]):
+            logger.error(f"CSV file not found: {sys.argv[2]}")
+            sys.exit(1)
+        import_occupation_vectors(sys.argv[2])
+        sys.exit(0)
+
     csv_path = sys.argv[1]
+    if len(sys.argv) != 2:
+        logger.error(usage)
+        sys.exit(1)
     if not os.path.exists(csv_path):
         logger.error(f"CSV file not found: {csv_path}")
         sys.exit(1)
@@ -0,0 +1,14 @@
+-- sql/document_extractions.sql
+-- Applicant data extracted from a document's CV text, stored once per
+-- document, prompt version and model (visa_assessment_service.get_document_applicant_data).
+-- The unique constraint is the conflict target of the service's upsert.
+
+create table if not exists document_extractions (
+    id uuid primary key default gen_random_uuid(),
+    document_id uuid not null references documents (id) on delete cascade,
+    prompt_version text not null,
+    model text not null,
+    applicant_data jsonb not null,
+    created_at timestamp not null default now(),
+    constraint document_extractions_document_prompt_model_key unique (document_id, prompt_version, model)
+);
@@ -0,0 +1,30 @@
+-- sql/occupation_vectors.sql
+-- Further embeddings per occupation (specialisations, task statements) beyond
+-- the title embedding in occupations.occupation_embedding. The occupation index
+-- loads them after the occupations and collapses matches back to one score per
+-- ANZSCO code. Filled by scripts/import_occupations.py --vectors.
+-- Run after occupations_updated_at.sql.
+
+create table if not exists occupation_vectors (
+    id bigint generated always as identity primary key,
+    anzsco_code text not null,  -- occupations.anzsco_code; vectors of unknown codes are ignored
+    kind text not null,  -- e.g. specialisation, task
+    text text not null,
+    embedding jsonb not null,
+    constraint occupation_vectors_code_kind_text_key unique (anzsco_code, kind, text)
+);
+
+-- Any change to an occupation's vectors bumps its updated_at, so index
+-- snapshots built before the change are seen as stale
+create or replace function touch_occupation_from_vector() returns trigger as $$
+begin
+    update occupations set updated_at = now()
+    where anzsco_code::text in (coalesce(new.anzsco_code, old.anzsco_code), coalesce(old.anzsco_code, new.anzsco_code));
+    return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists occupation_vectors_touch_occupation on occupation_vectors;
+create trigger occupation_vectors_touch_occupation
+    after insert or update or delete on occupation_vectors
+    for each row execute function touch_occupation_from_vector();
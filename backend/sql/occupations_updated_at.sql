@@ -0,0 +1,20 @@
+-- sql/occupations_updated_at.sql
+-- Last-change stamp on occupations. The occupation index snapshot records the
+-- latest updated_at it was built from and is rebuilt when that changes
+-- (occupation_index.snapshot_is_stale), so edits that keep the row count are seen.
+
+alter table occupations add column if not exists updated_at timestamptz not null default now();
+
+create index if not exists occupations_updated_at_idx on occupations (updated_at desc);
+
+create or replace function set_occupations_updated_at() returns trigger as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists occupations_set_updated_at on occupations;
+create trigger occupations_set_updated_at
+    before insert or update on occupations
+    for each row execute function set_occupations_updated_at();
@@ -0,0 +1,22 @@
+-- sql/save_documents.sql
+-- Inserts uploaded documents and their occupation matches in one call and one
+-- transaction (cv_pipeline.save_documents), instead of a documents insert
+-- followed by a dependent document_occupations insert. Both arguments are
+-- JSON arrays of rows shaped like cv_pipeline.document_row and match_rows;
+-- columns they leave out keep their defaults. Runs as the caller, so the same
+-- row-level security applies as to direct inserts.
+
+create or replace function save_documents(documents jsonb, occupations jsonb default '[]'::jsonb)
+returns void
+language plpgsql
+as $$
+begin
+    insert into documents (id, user_id, client_id, filename, file_type, file_size, extracted_text, created_at, updated_at)
+    select id, user_id, client_id, filename, file_type, file_size, extracted_text, created_at, updated_at
+    from jsonb_populate_recordset(null::documents, save_documents.documents);
+
+    insert into document_occupations (id, document_id, anzsco_code, occupation_name, confidence_score, created_at)
+    select id, document_id, anzsco_code, occupation_name, confidence_score, created_at
+    from jsonb_populate_recordset(null::document_occupations, save_documents.occupations);
+end;
+$$;
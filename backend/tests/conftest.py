@@ -0,0 +1,18 @@
+# tests/conftest.py
+import os
+import sys
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings require these; tests never reach the real services
+for name, value in {
+    "SUPABASE_URL": "http://localhost:54321",
+    "SUPABASE_KEY": "test-key",
+    "OPENAI_API_KEY": "sk-test",
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "GOOGLE_CLIENT_ID": "test-client",
+}.items():
+    os.environ.setdefault(name, value)
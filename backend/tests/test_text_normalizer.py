@@ -0,0 +1,43 @@
+# tests/test_text_normalizer.py
+from app.services.document_processor import PAGE_BREAK
+from app.services.text_normalizer import normalize_cv_text
+
+
+def pages_text(*pages: str) -> str:
+    return PAGE_BREAK.join(pages)
+
+
+def test_running_header_and_footer_kept_once():
+    text = pages_text(*[
+        f"Jane Citizen - Curriculum Vitae\nBody line {page}\nMore body {page}\njane@example.com | 0400 000 000"
+        for page in range(1, 4)
+    ])
+
+    lines = normalize_cv_text(text).splitlines()
+
+    assert lines.count("Jane Citizen - Curriculum Vitae") == 1
+    assert lines.count("jane@example.com | 0400 000 000") == 1
+    assert "Body line 3" in lines
+
+
+def test_repeated_body_lines_at_page_edges_stay():
+    text = pages_text(
+        "Senior Developer\nAcme Pty Ltd\nBuilt the billing platform\nResponsible for things",
+        "Senior Developer\nWidget Co\nLed a team of four\nResponsible for things",
+    )
+
+    lines = normalize_cv_text(text).splitlines()
+
+    assert lines.count("Senior Developer") == 2
+    assert lines.count("Responsible for things") == 2
+
+
+def test_margin_line_that_also_appears_in_body_stays():
+    text = pages_text(*[
+        f"Sydney\nRole {page}\nBased in Sydney\nSydney\nTask {page}\nSydney"
+        for page in range(1, 4)
+    ])
+
+    lines = normalize_cv_text(text).splitlines()
+
+    assert lines.count("Sydney") == 9
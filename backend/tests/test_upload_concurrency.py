@@ -0,0 +1,154 @@
+# tests/test_upload_concurrency.py
+import asyncio
+import io
+import time
+import zipfile
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import pytest
+from fastapi import Request
+
+from app.core.config import settings
+from app.main import app
+from app.services import cv_pipeline, occupation_index as occupation_index_module, occupation_matcher
+from app.services.auth_service import get_current_user
+from app.services.document_cache import DocumentCache
+from app.services.document_processor import shutdown_extraction_pool
+from app.services.embedding_cache import EmbeddingCache
+from app.services.llm_gateway import llm_gateway
+from app.services.occupation_index import OccupationIndex
+
+OPENAI_DELAY_SECONDS = 0.3
+UPLOADS = 4
+DIMENSION = 8
+
+
+def docx_bytes(text: str) -> bytes:
+    """A minimal DOCX holding one paragraph."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("[Content_Types].xml", '<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>')
+        archive.writestr(
+            "word/document.xml",
+            '<?xml version="1.0"?><w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f"<w:body><w:p><w:r><w:t>{text}</w:t></w:r></w:p></w:body></w:document>",
+        )
+    return buffer.getvalue()
+
+
+class FakeOpenAI:
+    """Answers chat and embeddings calls after a delay, recording how many overlap."""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create_chat))
+        self.embeddings = SimpleNamespace(create=self.create_embeddings)
+
+    async def _wait(self):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(OPENAI_DELAY_SECONDS)
+        finally:
+            self.active -= 1
+
+    async def create_chat(self, **request):
+        await self._wait()
+        # A new title per call, so no upload's embedding is served from the cache
+        content = f'{{"occupations": ["Widget Analyst {self.calls}"]}}'
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=None,
+        )
+
+    async def create_embeddings(self, **request):
+        await self._wait()
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=[1.0] + [0.0] * (DIMENSION - 1)) for _ in request["input"]],
+            usage=None,
+        )
+
+
+class FakeSupabase:
+    """Accepts the document inserts made when an upload is saved."""
+
+    def __init__(self):
+        self.inserted = []
+
+    def table(self, name):
+        return self
+
+    def insert(self, rows):
+        self.inserted.append(rows)
+        return self
+
+    def rpc(self, name, params):
+        return self.insert(params["documents"])
+
+    def execute(self):
+        return SimpleNamespace(data=self.inserted[-1])
+
+
+@pytest.fixture
+def stubbed_services(monkeypatch, tmp_path):
+    openai_client = FakeOpenAI()
+    supabase = FakeSupabase()
+    monkeypatch.setattr(llm_gateway, "client", openai_client)
+    monkeypatch.setattr(cv_pipeline, "get_supabase_client", lambda: supabase)
+    monkeypatch.setattr(cv_pipeline, "document_cache", DocumentCache(str(tmp_path / "documents.sqlite3"), 16, 3600, 100))
+    monkeypatch.setattr(occupation_matcher, "embedding_cache", EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), 16, 3600, 100))
+
+    # A fresh index, so the synthetic occupations never reach the process-wide one
+    index = OccupationIndex()
+    monkeypatch.setattr(occupation_index_module, "occupation_index", index)
+    embeddings = np.eye(2, DIMENSION, dtype=np.float32)
+    index.load_matrix(embeddings, [
+        {"anzsco_code": "261313", "occupation_name": "Software Engineer", "list": "MLTSSL", "visa_subclasses": "189", "assessing_authority": "ACS"},
+        {"anzsco_code": "233512", "occupation_name": "Mechanical Engineer", "list": "MLTSSL", "visa_subclasses": "189", "assessing_authority": "EA"},
+    ])
+
+    # Each upload is made for its own user, so per-user LLM limits do not serialize them
+    def current_user(request: Request):
+        return {"id": request.headers["x-test-user"]}
+
+    app.dependency_overrides[get_current_user] = current_user
+    yield openai_client, supabase
+    app.dependency_overrides.clear()
+    shutdown_extraction_pool()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cv_uploads_overlap(stubbed_services):
+    openai_client, supabase = stubbed_services
+    url = f"{settings.API_V1_STR}/documents/upload-cv"
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        # Warm the extraction pool so worker start-up is not part of the timing
+        await client.post(url, headers={"x-test-user": "warm-up"}, files={"file": ("warm.docx", docx_bytes("Warm up"), "application/octet-stream")})
+        openai_client.max_active = openai_client.calls = 0
+
+        started = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post(
+                url,
+                headers={"x-test-user": f"user-{i}"},
+                files={"file": (f"cv-{i}.docx", docx_bytes(f"Applicant {i} builds widgets"), "application/octet-stream")},
+            )
+            for i in range(UPLOADS)
+        ])
+        elapsed = time.perf_counter() - started
+
+    assert [response.status_code for response in responses] == [200] * UPLOADS
+    assert all(response.json()["occupation_matches"] for response in responses)
+
+    # Each upload makes a suggestion call then an embeddings call; made one at
+    # a time they would take calls * OPENAI_DELAY_SECONDS
+    sequential_seconds = openai_client.calls * OPENAI_DELAY_SECONDS
+    assert openai_client.calls > UPLOADS
+    assert openai_client.max_active > 1
+    assert elapsed < sequential_seconds / 2
@@ -0,0 +1,76 @@
+# tests/test_upload_limit.py
+import httpx
+import pytest
+from fastapi import FastAPI, File, UploadFile
+
+from app.api.upload_limit import FORM_OVERHEAD_BYTES, UploadLimitMiddleware
+
+LIMIT = 1024
+
+
+@pytest.fixture
+def limited_app():
+    app = FastAPI()
+    app.state.handled = 0
+    app.add_middleware(UploadLimitMiddleware, limits={"/upload": LIMIT})
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File()):
+        app.state.handled += 1
+        return {"size": len(await file.read())}
+
+    return app
+
+
+def client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_upload_within_limit_is_accepted(limited_app):
+    async with client(limited_app) as http:
+        response = await http.post("/upload", files={"file": ("cv.pdf", b"x" * LIMIT)})
+
+    assert response.status_code == 200
+    assert response.json() == {"size": LIMIT}
+
+
+@pytest.mark.asyncio
+async def test_declared_content_length_over_limit_is_rejected_unread(limited_app):
+    received = []
+
+    async def receive():
+        received.append(True)
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/upload",
+        "headers": [(b"content-length", str(LIMIT + FORM_OVERHEAD_BYTES + 1).encode())],
+    }
+    await UploadLimitMiddleware(limited_app, {"/upload": LIMIT})(scope, receive, send)
+
+    assert sent[0]["status"] == 413
+    assert received == []
+    assert limited_app.state.handled == 0
+
+
+@pytest.mark.asyncio
+async def test_streamed_body_over_limit_is_rejected(limited_app):
+    async def body():
+        # No Content-Length: the size is only known while streaming
+        yield b'--b\r\nContent-Disposition: form-data; name="file"; filename="cv.pdf"\r\n\r\n'
+        for _ in range(4):
+            yield b"x" * (LIMIT + FORM_OVERHEAD_BYTES)
+
+    async with client(limited_app) as http:
+        response = await http.post("/upload", content=body(), headers={"content-type": "multipart/form-data; boundary=b"})
+
+    assert response.status_code == 413
+    assert limited_app.state.handled == 0